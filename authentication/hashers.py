@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher
+
+
+# Hashers whose cost comes from settings. The algorithm names are unchanged, so
+# existing hashes still verify, and Django rehashes them on the next successful
+# login whenever the configured cost differs from the stored one (must_update).
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    def __init__(self):
+        self.iterations = getattr(settings, "PASSWORD_PBKDF2_ITERATIONS", None) or self.iterations
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    def __init__(self):
+        self.work_factor = getattr(settings, "PASSWORD_SCRYPT_WORK_FACTOR", None) or self.work_factor
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    def __init__(self):
+        self.time_cost = getattr(settings, "PASSWORD_ARGON2_TIME_COST", None) or self.time_cost
+        self.memory_cost = getattr(settings, "PASSWORD_ARGON2_MEMORY_COST", None) or self.memory_cost
+        self.parallelism = getattr(settings, "PASSWORD_ARGON2_PARALLELISM", None) or self.parallelism
@@ -0,0 +1,37 @@
+import time
+
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Measure signup (hash) and login (verify) throughput for each configured password hasher"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=20, help="Hashes and verifications per hasher")
+
+    def handle(self, *args, **options):
+        rounds = options["rounds"]
+        password = "correct horse battery staple"
+        self.stdout.write(f"{rounds} rounds per hasher, first one is used for new passwords")
+
+        for hasher in get_hashers():
+            try:
+                started = time.perf_counter()
+                for _ in range(rounds):
+                    encoded = hasher.encode(password, hasher.salt())
+                signup = time.perf_counter() - started
+
+                started = time.perf_counter()
+                for _ in range(rounds):
+                    hasher.verify(password, encoded)
+                login = time.perf_counter() - started
+            except (ValueError, ImportError) as exc:
+                # e.g. argon2-cffi not installed
+                self.stdout.write(f"{hasher.algorithm:<16} skipped: {exc}")
+                continue
+
+            self.stdout.write(
+                f"{hasher.algorithm:<16} signup {rounds / signup:8.1f}/s ({signup / rounds * 1000:7.1f}ms)  "
+                f"login {rounds / login:8.1f}/s ({login / rounds * 1000:7.1f}ms)"
+            )
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 11:04
+
+from django.db import migrations, models
+
+
+def fold_existing_users(apps, schema_editor):
+    User = apps.get_model('authentication', 'User')
+    users = list(User.objects.using(schema_editor.connection.alias).only('id', 'username', 'email'))
+    for user in users:
+        user.username_folded = user.username.casefold()
+        user.email_folded = user.email.casefold()
+    User.objects.using(schema_editor.connection.alias).bulk_update(users, ['username_folded', 'email_folded'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_user_managers_alter_user_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='username_folded',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=25),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='email_folded',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=80),
+        ),
+        migrations.RunPython(fold_existing_users, migrations.RunPython.noop),
+    ]
@@ -51,11 +51,28 @@ class User(AbstractUser):
     email = models.EmailField(max_length=80, unique=True)
     phone_number = PhoneNumberField(unique=True)
 
+    # Case-folded copies used for indexed prefix search
+    username_folded = models.CharField(max_length=25, db_index=True, editable=False, default="")
+    email_folded = models.CharField(max_length=80, db_index=True, editable=False, default="")
+
     USERNAME_FIELD = "email"
     EMAIL_FIELD = "email"
     REQUIRED_FIELDS = ["username", "phone_number"]
 
     objects = CustomUserManager()
 
+    def save(self, *args, **kwargs):
+        self.username_folded = (self.username or "").casefold()
+        self.email_folded = (self.email or "").casefold()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if "username" in update_fields:
+                update_fields.add("username_folded")
+            if "email" in update_fields:
+                update_fields.add("email_folded")
+            kwargs["update_fields"] = update_fields
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.email
@@ -1,3 +1,123 @@
-from django.test import TestCase
+import time
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, identify_hasher, make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+
+from .hashers import TunedPBKDF2PasswordHasher, TunedScryptPasswordHasher
+from .tokens import USER_CACHE_KEY, ClaimsJWTAuthentication, ClaimsTokenObtainPairSerializer, ClaimsUser, get_cached_user
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, JWT_REVOCATION_CHECK=False, JWT_CLAIMS_MAX_AGE=300)
+class ClaimsJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice@example.com', 'alice', '+12025550100', password='pass')
+
+    def get_user(self, token):
+        authentication = ClaimsJWTAuthentication()
+        return authentication.get_user(authentication.get_validated_token(str(token)))
+
+    def test_fresh_token_is_served_from_claims(self):
+        token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        with self.assertNumQueries(0):
+            user = self.get_user(token)
+        self.assertIsInstance(user, ClaimsUser)
+        self.assertEqual(user.email, 'alice@example.com')
+
+    def test_claims_user_ids_compare_with_user_pk(self):
+        token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        user = self.get_user(token)
+        self.assertEqual(user.id, self.user.pk)
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_old_token_loads_the_user(self):
+        token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        token['iat'] = int(time.time()) - 301
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.get_user(token)
+
+    def test_old_token_picks_up_demotion(self):
+        self.user.is_staff = True
+        self.user.save()
+        token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        token['iat'] = int(time.time()) - 301
+        self.user.is_staff = False
+        self.user.save()
+        self.assertFalse(self.get_user(token).is_staff)
+
+    @override_settings(JWT_REVOCATION_CHECK=True)
+    def test_revocation_check_loads_every_token(self):
+        token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.get_user(token)
+
+    def test_cached_user_leaves_out_the_password(self):
+        user = get_cached_user(self.user.pk)
+        self.assertEqual((user.pk, user.email, user.is_staff), (self.user.pk, 'alice@example.com', False))
+        cached = cache.get(USER_CACHE_KEY.format(self.user.pk))
+        self.assertEqual(set(cached), {'id', 'username', 'email', 'is_staff', 'is_active'})
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_user(self.user.pk).username, 'alice')
+
+
+# Hashers list the way settings builds it, with the given one first
+def password_hashers(name):
+    tuned = settings.TUNED_PASSWORD_HASHERS
+    return [tuned[name]] + [hasher for key, hasher in tuned.items() if key != name]
+
+
+# Iterations kept low so the tests stay fast; overriding PASSWORD_HASHERS as
+# well resets Django's cached hasher instances
+@override_settings(CACHES=LOCMEM_CACHE, METRICS_SAMPLE_RATE=0, PASSWORD_HASHERS=password_hashers('pbkdf2'), PASSWORD_PBKDF2_ITERATIONS=1000)
+class PasswordHasherTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice@example.com', 'alice', '+12025550100')
+        # Hash written by Django's stock hasher before the tuned ones existed
+        self.user.password = PBKDF2PasswordHasher().encode('pass', 'saltsaltsalt', iterations=2000)
+        self.user.save()
+
+    def login(self):
+        return self.client.post('/auth/jwt/create/', {'email': 'alice@example.com', 'password': 'pass'})
+
+    def test_existing_pbkdf2_hash_verifies(self):
+        self.assertIsInstance(identify_hasher(self.user.password), TunedPBKDF2PasswordHasher)
+        self.assertTrue(check_password('pass', self.user.password))
+        self.assertFalse(check_password('wrong', self.user.password))
+
+    def test_new_passwords_use_the_configured_cost(self):
+        self.assertTrue(make_password('pass').startswith('pbkdf2_sha256$1000$'))
+
+    def test_login_upgrades_the_hash(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(self.user.check_password('pass'))
+
+    @override_settings(PASSWORD_HASHERS=password_hashers('scrypt'), PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10)
+    def test_login_moves_pbkdf2_hash_to_the_configured_hasher(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertIsInstance(identify_hasher(self.user.password), TunedScryptPasswordHasher)
+        self.assertTrue(self.user.password.startswith(f'scrypt${2 ** 10}$'))
+        self.assertTrue(self.user.check_password('pass'))
+
+    def test_failed_login_keeps_the_hash(self):
+        password = self.user.password
+        self.assertEqual(self.client.post('/auth/jwt/create/', {'email': 'alice@example.com', 'password': 'wrong'}).status_code, 401)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, password)
@@ -0,0 +1,97 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+# User fields copied into every token so requests can be served without a user query
+TOKEN_CLAIMS = ("is_staff", "username", "email")
+
+# v2: field dicts, entries from before hold whole User objects
+USER_CACHE_KEY = "auth:user:v2:{}"
+
+
+# Issued by the djoser /auth/jwt/create/ endpoint
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in TOKEN_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+# Lightweight request.user built from the token claims
+class ClaimsUser(TokenUser):
+    # simplejwt stores the id claim as a string; compare like a User's int pk
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def email(self):
+        return self.token.get("email", "")
+
+
+# Only these fields are cached, never the password hash; the rest of the row
+# stays deferred and is loaded on access
+CACHED_USER_FIELDS = ("id", "username", "email", "is_staff", "is_active")
+
+
+def get_cached_user(user_id):
+    key = USER_CACHE_KEY.format(user_id)
+    fields = cache.get(key)
+    if fields is None:
+        try:
+            fields = User.objects.values(*CACHED_USER_FIELDS).get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        cache.set(key, fields, settings.JWT_USER_CACHE_TIMEOUT)
+
+    # from_db wants the values in the model's field order
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in fields]
+    user = User.from_db(None, names, [fields[name] for name in names])
+    if not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return user
+
+
+def forget_cached_user(user_id):
+    cache.delete(USER_CACHE_KEY.format(user_id))
+
+
+def trusts_claims(validated_token):
+    # Claims are only trusted while the token is young, so a deactivated or
+    # demoted account loses access within JWT_CLAIMS_MAX_AGE + JWT_USER_CACHE_TIMEOUT
+    if settings.JWT_REVOCATION_CHECK or not all(claim in validated_token for claim in TOKEN_CLAIMS):
+        return False
+    issued_at = validated_token.get("iat")
+    return issued_at is not None and time.time() - issued_at <= settings.JWT_CLAIMS_MAX_AGE
+
+
+# Builds request.user from the token claims without a database query.
+# Older tokens, tokens issued before the claims existed, or every token when
+# JWT_REVOCATION_CHECK is on, go through a short-lived cached user lookup instead
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+
+    def get_user(self, validated_token):
+        if not trusts_claims(validated_token):
+            try:
+                user_id = validated_token[api_settings.USER_ID_CLAIM]
+            except KeyError:
+                raise AuthenticationFailed(_("Token contained no recognizable user identification"), code="token_not_valid")
+            return get_cached_user(user_id)
+        return super().get_user(validated_token)
@@ -2,7 +2,7 @@ from django.shortcuts import render
 from rest_framework import generics,status
 from rest_framework.response import Response
 from .serializers import UserCreationSerializer
-from drf_yasg.utils import swagger_auto_schema
+from pizza.schema import swagger_auto_schema
 # Create your views here.
 
 class HelloAuthView(generics.GenericAPIView):
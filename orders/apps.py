@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class OrdersConfig(AppConfig):
     name = 'orders'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # Checks ORDER_THROTTLE_ENGINE against the cache backend
+        from . import throttling  # noqa: F401
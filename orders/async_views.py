@@ -0,0 +1,297 @@
+import json
+from abc import ABCMeta, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from pizza.renderers import FastJSONResponse
+from .models import Order
+from .serializers import OrderDetailSerializer, compact_order_list
+from .throttling import UserOrderThrottle, AdminOrderReadThrottle
+from .cache import aget_order_detail
+from . import views, events, conditional
+
+User = get_user_model()
+
+
+def not_found(model="Order"):
+    return FastJSONResponse({"detail": f"No {model} matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+
+
+def permission_denied(request):
+    if not request.user.is_authenticated:
+        return FastJSONResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+    return FastJSONResponse({"detail": "You do not have permission to perform this action."}, status=status.HTTP_403_FORBIDDEN)
+
+
+# Base for the async order read endpoints.
+# GET runs natively on the event loop; every other method is handed to the
+# synchronous DRF view that owns the same URL. Subclasses implement read().
+class AsyncOrderReadView(View, metaclass=ABCMeta):
+    sync_view = None
+    http_method_names = ["get", "post", "put", "delete", "head", "options"]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        if cls.sync_view is not None:
+            # Let drf_yasg document the endpoint from the DRF view
+            view.cls = cls.sync_view
+            view.initkwargs = {}
+        return csrf_exempt(view)
+
+    async def fallback(self, request, *args, **kwargs):
+        return await sync_to_async(self.sync_view.as_view())(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        return await self.fallback(request, *args, **kwargs)
+
+    async def put(self, request, *args, **kwargs):
+        return await self.fallback(request, *args, **kwargs)
+
+    async def delete(self, request, *args, **kwargs):
+        return await self.fallback(request, *args, **kwargs)
+
+    def get_throttles(self, request):
+        return [UserOrderThrottle()]
+
+    async def authenticate(self, request):
+        request = Request(request, authenticators=())
+        request.user = AnonymousUser()
+        for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+            result = await sync_to_async(authentication_class().authenticate)(request._request)
+            if result is not None:
+                request.user, request.auth = result
+                break
+        return request
+
+    async def check_throttles(self, request):
+        waits = []
+        for throttle in self.get_throttles(request):
+            if not await sync_to_async(throttle.allow_request)(request, self):
+                waits.append(throttle.wait())
+        if not waits:
+            return None
+        response = FastJSONResponse({"detail": "Request was throttled."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        durations = [wait for wait in waits if wait is not None]
+        if durations:
+            response["Retry-After"] = str(int(max(durations)))
+        return response
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            request = await self.authenticate(request)
+            throttled = await self.check_throttles(request)
+            if throttled is not None:
+                return throttled
+            return await self.read(request, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+            return FastJSONResponse(detail, status=exc.status_code)
+
+    # The GET response, for an authenticated and throttled DRF request
+    @abstractmethod
+    async def read(self, request, *args, **kwargs):
+        ...
+
+    async def paginate(self, request, paginator, orders, count):
+        page_size = paginator.get_page_size(request)
+        try:
+            number = int(request.query_params.get(paginator.page_query_param, 1))
+        except ValueError:
+            number = 0
+        last = max(1, -(-count // page_size))
+        if number < 1 or number > last:
+            return None
+
+        start = (number - 1) * page_size
+        page = [row async for row in orders.compact()[start:start + page_size]]
+        url = request.build_absolute_uri()
+        next_url = replace_query_param(url, paginator.page_query_param, number + 1) if number < last else None
+        if number <= 1:
+            previous_url = None
+        elif number == 2:
+            previous_url = remove_query_param(url, paginator.page_query_param)
+        else:
+            previous_url = replace_query_param(url, paginator.page_query_param, number - 1)
+        return {
+            "count": count,
+            "next": next_url,
+            "previous": previous_url,
+            "results": compact_order_list(page),
+        }
+
+    # Same validators as views.order_list_response
+    async def conditional_list(self, request, orders):
+        paginator = views.get_order_paginator(request)
+        if not isinstance(paginator, views.StandardResultsSetPagination):
+            # Cursor mode keeps DRF's implementation
+            page = await sync_to_async(paginator.paginate_queryset)(orders.compact(), request)
+            etag = conditional.page_etag(request, page, paginator.get_next_link(), paginator.get_previous_link())
+            not_modified = conditional.check(request, etag, None)
+            if not_modified is not None:
+                return not_modified
+            data = paginator.get_paginated_response(compact_order_list(page)).data
+            return conditional.with_validators(FastJSONResponse(data), etag, None)
+
+        summary = await conditional.alist_summary(orders)
+        etag = conditional.list_etag(request, summary)
+        not_modified = conditional.check(request, etag, None)
+        if not_modified is not None:
+            return not_modified
+
+        data = await self.paginate(request, paginator, orders, summary["total"])
+        if data is None:
+            return FastJSONResponse({"detail": "Invalid page."}, status=status.HTTP_404_NOT_FOUND)
+        return conditional.with_validators(FastJSONResponse(data), etag, None)
+
+    def detail_response(self, request, data):
+        validators = conditional.order_validators(data["id"], data["updated_at"])
+        not_modified = conditional.check(request, *validators)
+        if not_modified is not None:
+            return not_modified
+        return conditional.with_validators(FastJSONResponse(data), *validators)
+
+
+# List all orders
+class AsyncOrderCreateListView(AsyncOrderReadView):
+    sync_view = views.OrderCreateListView
+
+    def get_throttles(self, request):
+        if request.user.is_staff:
+            return [AdminOrderReadThrottle()]
+        return [UserOrderThrottle()]
+
+    async def read(self, request):
+        orders = views.filter_orders(request.query_params, Order.objects.for_listing(), search_customer=True)
+        return await self.conditional_list(request, orders)
+
+
+# Retrieve an order by id (Admin only); DELETE goes to the DRF view
+class AsyncOrderDetailView(AsyncOrderReadView):
+    sync_view = views.OrderDetailView
+
+    def get_throttles(self, request):
+        return [AdminOrderReadThrottle()]
+
+    async def read(self, request, order_id):
+        if not request.user.is_staff:
+            return permission_denied(request)
+        data = await aget_order_detail(order_id, lambda: aload_order_detail(order_id))
+        if data is None:
+            return not_found()
+        return self.detail_response(request, data)
+
+
+async def aload_order_detail(order_id):
+    try:
+        order = await Order.objects.for_listing().aget(pk=order_id)
+    except Order.DoesNotExist:
+        return None
+    return dict(OrderDetailSerializer(order).data)
+
+
+async def resolve_customer(request, user_id):
+    # Id of the customer whose orders are read: admins can read anyone's, everyone else only their own
+    if request.user.is_staff and user_id:
+        if await User.objects.filter(pk=user_id).aexists():
+            return user_id
+        return None
+    return request.user.id
+
+
+# List all orders of a user
+class AsyncUserOrdersView(AsyncOrderReadView):
+    sync_view = views.UserOrdersView
+
+    async def read(self, request, user_id=None):
+        if not request.user.is_authenticated:
+            return permission_denied(request)
+        customer_id = await resolve_customer(request, user_id)
+        if customer_id is None:
+            return not_found("User")
+
+        orders = views.filter_orders(request.query_params, Order.objects.for_listing().filter(customer_id=customer_id))
+        return await self.conditional_list(request, orders)
+
+
+# Retrieve a specific order for a user
+class AsyncUserOrderDetail(AsyncOrderReadView):
+    sync_view = views.UserOrderDetail
+
+    async def read(self, request, order_id, user_id=None):
+        if not request.user.is_authenticated:
+            return permission_denied(request)
+        customer_id = await resolve_customer(request, user_id)
+        if customer_id is None:
+            return not_found("User")
+
+        data = await aget_order_detail(order_id, lambda: aload_order_detail(order_id))
+        if data is None or data["customer"]["id"] != customer_id:
+            return not_found()
+        return self.detail_response(request, data)
+
+
+
+def sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Server-Sent Events stream of an order's status changes (serve with ASGI).
+# Same owner/staff rules as UserOrderDetail; the stream ends once the order is delivered
+class AsyncOrderEventsView(AsyncOrderReadView):
+    http_method_names = ["get", "options"]
+
+    async def get(self, request, *args, **kwargs):
+        # Under WSGI the stream would be buffered and hold the worker, and the
+        # per-request event loop the subscription lives on closes under it
+        if not isinstance(request, ASGIRequest):
+            return FastJSONResponse(
+                {"detail": "Order events are only served under ASGI (pizza.asgi)."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        return await super().get(request, *args, **kwargs)
+
+    async def read(self, request, order_id, user_id=None):
+        if not request.user.is_authenticated:
+            return permission_denied(request)
+        customer_id = await resolve_customer(request, user_id)
+        if customer_id is None:
+            return not_found("User")
+
+        data = await aget_order_detail(order_id, lambda: aload_order_detail(order_id))
+        if data is None or data["customer"]["id"] != customer_id:
+            return not_found()
+
+        # Subscribe before sending the snapshot so no change slips in between
+        subscription = await events.get_backend().subscribe(order_id)
+        response = StreamingHttpResponse(self.stream(subscription, data), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def stream(self, subscription, data):
+        delivered = Order.StatusChoices.DELIVERED.label
+        keepalive = settings.ORDER_EVENTS_KEEPALIVE
+        try:
+            yield sse_message("status", {key: data[key] for key in ("id", "order_status", "updated_at")})
+            status_label = data["order_status"]
+            while status_label != delivered:
+                event = await subscription.get(timeout=keepalive)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                status_label = event["order_status"]
+                yield sse_message("status", event)
+        finally:
+            await subscription.close()
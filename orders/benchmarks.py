@@ -0,0 +1,91 @@
+import random
+import statistics
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from .models import Order
+from . import search, stats
+
+User = get_user_model()
+
+
+# Shared pieces of the benchmark and load-test commands
+
+# Rough production mix: most orders are old and delivered
+STATUS_WEIGHTS = {
+    Order.StatusChoices.PENDING: 15,
+    Order.StatusChoices.IN_TRANSIT: 10,
+    Order.StatusChoices.DELIVERED: 75,
+}
+SIZE_WEIGHTS = {
+    Order.SizeChoices.SMALL: 20,
+    Order.SizeChoices.MEDIUM: 40,
+    Order.SizeChoices.LARGE: 30,
+    Order.SizeChoices.EXTRA_LARGE: 10,
+}
+QUANTITY_WEIGHTS = {1: 55, 2: 25, 3: 10, 4: 6, 5: 4}
+
+BENCH_PASSWORD = "bench-password"
+
+
+def percentile(samples, percent):
+    # samples must be sorted
+    index = min(len(samples) - 1, int(round(percent / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def summarize_latencies(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def weighted(rng, weights, count):
+    return rng.choices(list(weights), weights=list(weights.values()), k=count)
+
+
+def make_user(index, password, **extra):
+    return User(
+        email=f"bench{index}@example.com",
+        username=f"bench{index}",
+        username_folded=f"bench{index}",
+        email_folded=f"bench{index}@example.com",
+        phone_number=f"+1{2025550000 + index}",
+        password=password,
+        **extra,
+    )
+
+
+@transaction.atomic
+def seed(users, orders, seed=0, batch_size=1000):
+    # bulk_create skips the signals, so the search index and stats are fed directly
+    rng = random.Random(seed)
+    password = make_password(BENCH_PASSWORD)
+    start = (User.objects.order_by("-pk").values_list("pk", flat=True).first() or 0) + 1
+
+    customers = User.objects.bulk_create(
+        [make_user(start + i, password) for i in range(users)], batch_size=batch_size
+    )
+    created = 0
+    while created < orders:
+        count = min(batch_size, orders - created)
+        batch = Order.objects.bulk_create([
+            Order(customer=customer, size=size, order_status=order_status, quantity=quantity)
+            for customer, size, order_status, quantity in zip(
+                rng.choices(customers, k=count),
+                weighted(rng, SIZE_WEIGHTS, count),
+                weighted(rng, STATUS_WEIGHTS, count),
+                weighted(rng, QUANTITY_WEIGHTS, count),
+            )
+        ])
+        search.index_orders(batch)
+        stats.record_created(batch)
+        created += count
+    return customers, created
@@ -0,0 +1,55 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+DETAIL_KEY = "orders:detail:{}"
+
+# Hit and miss counts, kept per process like pizza.metrics: counting in the
+# shared cache cost a write (a file on FileBasedCache) on every read
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _count(stat):
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+# Read-through cache for serialized order details, dropped by the Order and User signals
+def get_order_detail(order_id, load):
+    key = DETAIL_KEY.format(order_id)
+    data = cache.get(key)
+    if data is not None:
+        _count("hits")
+        return data
+
+    _count("misses")
+    data = load()
+    cache.set(key, data, timeout=settings.ORDER_DETAIL_CACHE_TIMEOUT)
+    return data
+
+
+# Async variant for the ASGI views, load() is a coroutine returning None when missing
+async def aget_order_detail(order_id, load):
+    key = DETAIL_KEY.format(order_id)
+    data = await cache.aget(key)
+    if data is not None:
+        _count("hits")
+        return data
+
+    _count("misses")
+    data = await load()
+    if data is not None:
+        await cache.aset(key, data, timeout=settings.ORDER_DETAIL_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_order_detail(*order_ids):
+    cache.delete_many([DETAIL_KEY.format(order_id) for order_id in order_ids])
+
+
+def get_stats():
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,129 @@
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from .models import Order, OrderChanged, OrderStats
+from .serializers import DATETIME_FIELD
+
+
+# Conditional requests (ETag / Last-Modified) for the order endpoints
+
+
+def order_validators(order_id, updated_at):
+    # updated_at as rendered by OrderDetailSerializer, so cached payloads can be used directly
+    etag = quote_etag(f"order-{order_id}-{updated_at}")
+    return etag, parse_datetime(updated_at)
+
+
+def instance_validators(order):
+    return order_validators(order.pk, DATETIME_FIELD.to_representation(order.updated_at))
+
+
+# Versions the list tags by the customers' username/email, which list rows carry
+CUSTOMERS_VERSION_KEY = "orders:customers-version"
+
+
+def list_summary(orders):
+    # One aggregate query; page-number pagination reuses its count
+    if not orders.query.has_filters():
+        return unfiltered_summary()
+    return orders.order_by().aggregate(latest=Max('updated_at'), total=Count('id'))
+
+
+async def alist_summary(orders):
+    if not orders.query.has_filters():
+        return await unfiltered_asummary()
+    return await orders.order_by().aaggregate(latest=Max('updated_at'), total=Count('id'))
+
+
+# Aggregating the unfiltered list scans every order: the count comes from the
+# stats counters instead and the latest update from order_updated_idx
+def unfiltered_summary():
+    return {
+        'latest': Order.objects.order_by().aggregate(latest=Max('updated_at'))['latest'],
+        'total': OrderStats.objects.order_by().aggregate(total=Sum('order_count'))['total'] or 0,
+    }
+
+
+async def unfiltered_asummary():
+    return {
+        'latest': (await Order.objects.order_by().aaggregate(latest=Max('updated_at')))['latest'],
+        'total': (await OrderStats.objects.order_by().aaggregate(total=Sum('order_count')))['total'] or 0,
+    }
+
+
+def list_etag(request, summary):
+    # The page, filters and user are part of the tag; a new or updated order
+    # moves the latest update, a deleted one the count. Lists get no
+    # Last-Modified since a deletion doesn't move the latest update
+    latest = summary['latest']
+    return tag(request, f"{summary['total']}|{latest.isoformat() if latest else ''}")
+
+
+def page_etag(request, rows, *links):
+    # Cursor pages skip the aggregate and are tagged from the rows they return
+    return tag(request, "|".join([*(link or '' for link in links), *(f"{row.id}:{row.updated_at.isoformat()}" for row in rows)]))
+
+
+def tag(request, version):
+    user = getattr(request.user, 'pk', None) or 'anon'
+    key = f"{request.get_full_path()}|{user}|{customers_version()}|{version}"
+    return quote_etag("orders-" + hashlib.sha1(key.encode()).hexdigest())
+
+
+def customers_version():
+    # A lost key only changes the tags once
+    version = cache.get(CUSTOMERS_VERSION_KEY)
+    if version is None:
+        cache.add(CUSTOMERS_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(CUSTOMERS_VERSION_KEY, '')
+    return version
+
+
+def customer_changed():
+    # After the commit, a list read in between must not be tagged with the new version
+    transaction.on_commit(lambda: cache.set(CUSTOMERS_VERSION_KEY, uuid.uuid4().hex, timeout=None))
+
+
+def check(request, etag, last_modified):
+    # 304 for a matching GET, 412 for a failed If-Match / If-Unmodified-Since, else None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+# Saves a validated update with UPDATE ... WHERE updated_at = <the version it was
+# checked against>, so a write that landed after the If-Match check isn't
+# overwritten. False when the row moved on and nothing was written
+def save_if_unchanged(serializer):
+    order = serializer.instance
+    order.expected_updated_at = order.updated_at
+    try:
+        with transaction.atomic():
+            serializer.save()
+    except OrderChanged:
+        order.updated_at = order.expected_updated_at
+        return False
+    finally:
+        order.expected_updated_at = None
+    return True
+
+
+def write_conflict(request):
+    # 412 when the client sent a precondition, it no longer holds
+    if 'If-Match' in request.headers or 'If-Unmodified-Since' in request.headers:
+        return Response({"detail": "The order was modified by another request."}, status=status.HTTP_412_PRECONDITION_FAILED)
+    return Response({"detail": "The order was modified by another request, retry."}, status=status.HTTP_409_CONFLICT)
+
+
+def with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from .serializers import CHOICE_LABELS
+from .models import Order
+
+
+STATUS_LABELS = CHOICE_LABELS[Order.StatusChoices]
+
+
+# In-process pub/sub: subscribers only see events published by the same worker
+class LocalEventBackend:
+
+    class Subscription:
+        def __init__(self, backend, order_id):
+            self.backend = backend
+            self.order_id = order_id
+            self.loop = asyncio.get_running_loop()
+            self.queue = asyncio.Queue()
+
+        async def get(self, timeout):
+            try:
+                return await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+        async def close(self):
+            self.backend.unsubscribe(self)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+
+    async def subscribe(self, order_id):
+        subscription = self.Subscription(self, order_id)
+        with self.lock:
+            self.subscribers[order_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.order_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.order_id]
+
+    def publish(self, order_id, event):
+        # Called from sync code (request threads), hand the event to each subscriber's loop
+        with self.lock:
+            subscribers = list(self.subscribers.get(order_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, event)
+            except RuntimeError:
+                # Subscriber's loop already closed
+                self.unsubscribe(subscription)
+
+
+# Redis pub/sub, shares events between workers. Needs the redis package
+class RedisEventBackend:
+    CHANNEL = "orders:events:{}"
+
+    class Subscription:
+        def __init__(self, pubsub):
+            self.pubsub = pubsub
+
+        async def get(self, timeout):
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+            return json.loads(message["data"]) if message else None
+
+        async def close(self):
+            await self.pubsub.aclose()
+
+    def __init__(self):
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError as exc:
+            raise ImproperlyConfigured("RedisEventBackend requires the redis package") from exc
+        url = settings.ORDER_EVENTS_REDIS_URL
+        self.client = redis.Redis.from_url(url)
+        self.async_client = redis.asyncio.Redis.from_url(url)
+
+    async def subscribe(self, order_id):
+        pubsub = self.async_client.pubsub()
+        await pubsub.subscribe(self.CHANNEL.format(order_id))
+        return self.Subscription(pubsub)
+
+    def publish(self, order_id, event):
+        self.client.publish(self.CHANNEL.format(order_id), json.dumps(event))
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.ORDER_EVENTS_BACKEND)()
+    return _backend
+
+
+def status_event(order_id, order_status, updated_at):
+    return {
+        "id": order_id,
+        "order_status": STATUS_LABELS.get(order_status, order_status),
+        "updated_at": updated_at.isoformat(),
+    }
+
+
+def publish_status(order_id, order_status, updated_at):
+    get_backend().publish(order_id, status_event(order_id, order_status, updated_at))
+
+
+def publish_statuses(order_ids, order_status, updated_at):
+    backend = get_backend()
+    for order_id in order_ids:
+        backend.publish(order_id, status_event(order_id, order_status, updated_at))
@@ -0,0 +1,91 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .serializers import CHOICE_LABELS, DATETIME_FIELD
+from .models import Order
+
+
+EXPORT_FIELDS = [
+    "id", "customer_id", "customer__username", "customer__email",
+    "size", "order_status", "quantity", "created_at", "updated_at",
+]
+EXPORT_HEADER = [
+    "id", "customer_id", "customer_username", "customer_email",
+    "size", "order_status", "quantity", "created_at", "updated_at",
+]
+
+SIZE_LABELS = CHOICE_LABELS[Order.SizeChoices]
+STATUS_LABELS = CHOICE_LABELS[Order.StatusChoices]
+
+
+# csv.writer target that hands the formatted line straight back
+class Echo:
+    def write(self, value):
+        return value
+
+
+def format_row(row):
+    order_id, customer_id, username, email, size, order_status, quantity, created_at, updated_at = row
+    return [
+        order_id, customer_id, username, email,
+        SIZE_LABELS.get(size, size), STATUS_LABELS.get(order_status, order_status), quantity,
+        # Same format as the API payloads
+        DATETIME_FIELD.to_representation(created_at), DATETIME_FIELD.to_representation(updated_at),
+    ]
+
+
+def export_rows(orders):
+    # Server-side cursor, only one chunk of rows is held in memory
+    for row in orders.values_list(*EXPORT_FIELDS).iterator(chunk_size=settings.ORDER_EXPORT_CHUNK_SIZE):
+        yield format_row(row)
+
+
+async def aexport_rows(orders):
+    # aiterator() runs values_list()'s query on the event loop, so chunks of the
+    # sync iterator are pulled through sync_to_async instead
+    rows = export_rows(orders)
+    next_chunk = sync_to_async(lambda: list(islice(rows, settings.ORDER_EXPORT_CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        for row in chunk:
+            yield row
+
+
+# Encoders return the header line (or None) and the function formatting a row
+def ndjson_encoder():
+    return None, lambda row: json.dumps(dict(zip(EXPORT_HEADER, row))) + "\n"
+
+
+def csv_encoder():
+    writer = csv.writer(Echo())
+    return writer.writerow(EXPORT_HEADER), writer.writerow
+
+
+def lines(orders, encoder):
+    header, encode = encoder()
+    if header is not None:
+        yield header
+    for row in export_rows(orders):
+        yield encode(row)
+
+
+# Under ASGI a sync iterator would be drained into a list before the first byte is sent
+async def alines(orders, encoder):
+    header, encode = encoder()
+    if header is not None:
+        yield header
+    async for row in aexport_rows(orders):
+        yield encode(row)
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", ndjson_encoder),
+    "csv": ("text/csv", csv_encoder),
+}
+
+
+def export_orders(orders, export_format, asynchronous=False):
+    content_type, encoder = EXPORT_FORMATS[export_format]
+    return content_type, (alines if asynchronous else lines)(orders, encoder)
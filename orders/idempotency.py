@@ -0,0 +1,193 @@
+import hashlib
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import IdempotencyKey
+
+
+# Idempotency-Key support for the order write endpoints.
+# The first request with a key runs and its response is stored per user for
+# IDEMPOTENCY_TTL seconds; retries with the same key get the stored response
+# back after a single lookup, without validation, throttling or any order query.
+# Keys live in the IdempotencyKey table: its unique (user, scope) row is the
+# lock, so concurrent duplicates wait for the first one instead of running twice.
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# Response headers replayed along with the body
+STORED_HEADERS = ("Content-Type", "Location", "ETag", "Last-Modified")
+# Not stored, a retry runs again: 429 once the throttle allows it, 409/412 once
+# the conflicting request finished or the client has the current ETag
+RETRIED_STATUSES = {
+    status.HTTP_409_CONFLICT,
+    status.HTTP_412_PRECONDITION_FAILED,
+    status.HTTP_429_TOO_MANY_REQUESTS,
+}
+POLL_INTERVAL = 0.05
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed, retry later."
+    default_code = "idempotency_conflict"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used with a different request."
+    default_code = "idempotency_key_reused"
+
+
+# Raised from the throttle check to hand a stored response to handle_exception
+class Replay(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def replay(stored, fingerprint):
+    if stored.fingerprint != fingerprint:
+        raise IdempotencyKeyReused()
+    response = HttpResponse(bytes(stored.content), status=stored.status_code)
+    for header, value in stored.headers.items():
+        response[header] = value
+    response["Idempotent-Replayed"] = "true"
+    return Replay(response)
+
+
+class IdempotentRequest:
+    def __init__(self, request, key):
+        # Keys are scoped to the user and endpoint, the fingerprint catches reuse with another body
+        self.user_id = request.user.id
+        self.scope = hashlib.sha256(f"{request.method}:{request.path}:{key}".encode()).hexdigest()
+        self.fingerprint = hashlib.sha256(request.body).hexdigest()
+        self.token = None
+
+    def keys(self):
+        return IdempotencyKey.objects.filter(user_id=self.user_id, scope=self.scope)
+
+    def acquire(self):
+        deadline = time.monotonic() + settings.IDEMPOTENCY_LOCK_WAIT
+        while True:
+            stored = self.keys().first()
+            now = timezone.now()
+            if stored is None:
+                if self.insert(now):
+                    return
+                continue
+            if stored.status_code is not None:
+                if stored.created_at > now - timedelta(seconds=settings.IDEMPOTENCY_TTL):
+                    raise replay(stored, self.fingerprint)
+                # An expired response, the key starts over
+                if self.take_over(stored, now):
+                    return
+            elif stored.locked_until <= now and self.take_over(stored, now):
+                # The holder died without releasing the key
+                return
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict()
+            time.sleep(POLL_INTERVAL)
+
+    def lock(self, now):
+        self.token = uuid.uuid4().hex
+        return {
+            "fingerprint": self.fingerprint,
+            "token": self.token,
+            "locked_until": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT),
+            "created_at": now,
+        }
+
+    def insert(self, now):
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(user_id=self.user_id, scope=self.scope, **self.lock(now))
+        except IntegrityError:
+            # Another request inserted the key first
+            self.token = None
+            return False
+        return True
+
+    def take_over(self, stored, now):
+        # Only one of the requests that saw the same stale row gets to update it
+        taken = IdempotencyKey.objects.filter(pk=stored.pk, token=stored.token).update(
+            status_code=None, content=b"", headers={}, **self.lock(now),
+        )
+        if not taken:
+            self.token = None
+        return bool(taken)
+
+    def release(self):
+        if self.token is not None:
+            self.keys().filter(token=self.token, status_code=None).delete()
+        self.token = None
+
+    def finish(self, response):
+        # Failed, throttled and precondition-failed requests are not stored so the client can retry them
+        if self.token is not None and response.status_code < 500 and response.status_code not in RETRIED_STATUSES:
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+            self.keys().filter(token=self.token).update(
+                status_code=response.status_code,
+                content=response.content,
+                headers={header: response[header] for header in STORED_HEADERS if response.has_header(header)},
+                locked_until=None,
+            )
+            self.token = None
+        self.release()
+
+
+# Drops keys past IDEMPOTENCY_TTL, stored or left locked (purge_idempotency_keys)
+def purge():
+    now = timezone.now()
+    return IdempotencyKey.objects.filter(
+        created_at__lt=now - timedelta(seconds=max(settings.IDEMPOTENCY_TTL, settings.IDEMPOTENCY_LOCK_TIMEOUT)),
+    ).delete()[0]
+
+
+def get_idempotency_key(request):
+    key = request.headers.get(HEADER)
+    if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise ValidationError({"detail": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters."})
+    return key
+
+
+# Adds Idempotency-Key support to the idempotent_methods of a DRF view.
+# Runs after authentication and permissions, before the throttles, so a
+# replay doesn't use up throttle quota.
+class IdempotentViewMixin:
+    idempotent_methods = ("POST",)
+    idempotency = None
+
+    def check_throttles(self, request):
+        self.idempotency = None
+        if request.method in self.idempotent_methods and request.user.is_authenticated:
+            key = get_idempotency_key(request)
+            if key is not None:
+                idempotency = IdempotentRequest(request, key)
+                idempotency.acquire()
+                self.idempotency = idempotency
+        super().check_throttles(request)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, Replay):
+            return exc.response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            if self.idempotency is not None:
+                self.idempotency.release()
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.idempotency is not None:
+            self.idempotency.finish(response)
+            self.idempotency = None
+        return response
@@ -0,0 +1,62 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from orders.models import Order
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure order create and list throughput from concurrent workers with the current "
+        "database settings. Run it with DB_CONN_MAX_AGE=0 / DB_POOL on and off to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8, help="Concurrent worker threads")
+        parser.add_argument("--iterations", type=int, default=200, help="Requests per worker and operation")
+        parser.add_argument("--customer", type=int, help="Customer id for created orders (default: first user)")
+
+    def run_workers(self, operation, workers, iterations):
+        def work(_):
+            for _ in range(iterations):
+                operation()
+                # What Django does at the end of every request
+                close_old_connections()
+            connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(work, range(workers)))
+        return workers * iterations / (time.perf_counter() - started)
+
+    def handle(self, *args, **options):
+        customer = User.objects.filter(pk=options["customer"]).first() if options["customer"] else User.objects.order_by("pk").first()
+        if customer is None:
+            raise CommandError("No customer to create orders for, create a user first")
+
+        db = settings.DATABASES["default"]
+        self.stdout.write(
+            f"{db['ENGINE']}  CONN_MAX_AGE={db.get('CONN_MAX_AGE', 0)}  pool={'pool' in db.get('OPTIONS', {})}  "
+            f"{options['workers']} workers x {options['iterations']} iterations"
+        )
+
+        created = []
+
+        def create():
+            created.append(Order.objects.create(customer=customer, size=Order.SizeChoices.SMALL, quantity=1).pk)
+
+        def list_page():
+            list(Order.objects.for_listing()[:10])
+
+        try:
+            for name, operation in (("create", create), ("list", list_page)):
+                rate = self.run_workers(operation, options["workers"], options["iterations"])
+                self.stdout.write(f"{name:<8} {rate:8.1f} ops/s")
+        finally:
+            # Go through delete() so the signals keep search and stats in sync
+            Order.objects.filter(pk__in=created).delete()
@@ -0,0 +1,58 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from orders.models import Order
+from orders.serializers import OrderDetailSerializer
+from pizza.renderers import FastJSONParser, FastJSONRenderer, fast_json_enabled
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of FastJSONRenderer/FastJSONParser with DRF's JSONRenderer/JSONParser "
+        "on real order payloads (orders.tests checks that their output is identical)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=50, help="Orders in the list payload")
+        parser.add_argument("--bulk-size", type=int, default=500, help="Orders in the bulk create payload")
+        parser.add_argument("--rounds", type=int, default=200, help="Renders and parses per payload")
+
+    def get_payloads(self, page_size, bulk_size):
+        orders = OrderDetailSerializer(Order.objects.for_listing()[:page_size], many=True).data
+        if not orders:
+            raise CommandError("No orders to render, seed some with seed_orders first")
+        return {
+            "list page": {"count": Order.objects.count(), "next": None, "previous": None, "results": orders},
+            "detail": orders[0],
+            "bulk create": [{"size": "Large", "quantity": 2}] * bulk_size,
+        }
+
+    def time(self, function, rounds):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            function()
+        return rounds / (time.perf_counter() - started)
+
+    def handle(self, *args, **options):
+        if not fast_json_enabled():
+            self.stdout.write(self.style.WARNING("orjson not installed or FAST_JSON off, both sides use the stdlib"))
+
+        payloads = self.get_payloads(options["page_size"], options["bulk_size"])
+        reference, fast = JSONRenderer(), FastJSONRenderer()
+        reference_parser, fast_parser = JSONParser(), FastJSONParser()
+
+        rounds = options["rounds"]
+        for name, data in payloads.items():
+            body = reference.render(data)
+            render_before = self.time(lambda: reference.render(data), rounds)
+            render_after = self.time(lambda: fast.render(data), rounds)
+            parse_before = self.time(lambda: reference_parser.parse(io.BytesIO(body)), rounds)
+            parse_after = self.time(lambda: fast_parser.parse(io.BytesIO(body)), rounds)
+            self.stdout.write(
+                f"{name:<12} {len(body):>8} bytes  render {render_before:9.1f} -> {render_after:9.1f}/s "
+                f"(x{render_after / render_before:.1f})  parse {parse_before:9.1f} -> {parse_after:9.1f}/s "
+                f"(x{parse_after / parse_before:.1f})"
+            )
@@ -0,0 +1,157 @@
+import json
+import time
+from contextlib import ExitStack
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from authentication.tokens import ClaimsTokenObtainPairSerializer
+from orders.benchmarks import make_user, summarize_latencies
+from orders.models import Order
+
+User = get_user_model()
+
+
+# name -> (method, path, body). {order} is an order owned by the bench admin
+SCENARIOS = {
+    "list": ("GET", "/orders/orders/", None),
+    "list_filters": ("GET", "/orders/orders/?status=pending&size=large", None),
+    "search": ("GET", "/orders/orders/?search=bench1", None),
+    "detail": ("GET", "/orders/orders/{order}/", None),
+    "create": ("POST", "/orders/orders/", {"size": "Medium", "quantity": 2}),
+    "status_update": ("PUT", "/orders/orders/{order}/status/", {"order_status": "In Transit"}),
+    "my_orders": ("GET", "/orders/my/orders/", None),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time each order endpoint through the Django test client (or a running server with "
+        "--base-url) and report throughput, p50/p95/p99 latency and queries per request as JSON. "
+        "Seed data first with seed_orders. With --baseline the run fails when p95 or the query "
+        "count regresses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", action="append", dest="scenarios", choices=sorted(SCENARIOS), help="Scenario to run, repeatable (default: all)")
+        parser.add_argument("--iterations", type=int, default=200, help="Timed requests per scenario")
+        parser.add_argument("--warmup", type=int, default=10, help="Untimed requests per scenario")
+        parser.add_argument("--base-url", help="Benchmark a running server instead of the test client")
+        parser.add_argument("--output", help="Write the JSON report to this file")
+        parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown against the baseline, 0.2 = 20%%")
+
+    def create_admin(self):
+        # Throwaway staff account so the admin-only scenarios can run: no usable
+        # password, requests carry a token minted here, deleted after the run
+        index = (User.objects.order_by("-pk").values_list("pk", flat=True).first() or 0) + 1
+        admin = make_user(index, make_password(None), is_staff=True)
+        admin.save()
+        return admin
+
+    def make_sender(self, base_url, token):
+        headers = {"Authorization": f"Bearer {token}"}
+        if base_url:
+            session = requests.Session()
+            session.headers.update(headers)
+
+            def send(method, path, body):
+                return session.request(method, base_url.rstrip("/") + path, json=body, timeout=30).status_code
+        else:
+            client = Client(HTTP_HOST="localhost", HTTP_AUTHORIZATION=headers["Authorization"])
+
+            def send(method, path, body):
+                return client.generic(method, path, json.dumps(body) if body is not None else "", content_type="application/json").status_code
+        return send
+
+    def run_scenario(self, send, method, path, body, options):
+        for _ in range(options["warmup"]):
+            send(method, path, body)
+
+        latencies, queries, errors = [], 0, 0
+        # Queries are only visible when the requests run in this process
+        aliases = [] if options["base_url"] else list(settings.DATABASES)
+        started = time.perf_counter()
+        for _ in range(options["iterations"]):
+            with ExitStack() as stack:
+                captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in aliases]
+                request_started = time.perf_counter()
+                status_code = send(method, path, body)
+                latencies.append(time.perf_counter() - request_started)
+            queries += sum(len(context) for context in captured)
+            errors += status_code >= 400
+        result = summarize_latencies(latencies, time.perf_counter() - started)
+        result["queries"] = round(queries / options["iterations"], 2) if aliases else None
+        result["errors"] = errors
+        return result
+
+    def compare(self, report, baseline, tolerance):
+        regressions = []
+        for name, result in report["scenarios"].items():
+            before = baseline.get("scenarios", {}).get(name)
+            if before is None:
+                continue
+            if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+            if result["queries"] is not None and before.get("queries") is not None and result["queries"] > before["queries"]:
+                regressions.append(f"{name}: queries {before['queries']} -> {result['queries']}")
+        return regressions
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1 or options["warmup"] < 0:
+            raise CommandError("--iterations must be positive and --warmup can't be negative")
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Can't read baseline {options['baseline']}: {exc}")
+
+        admin = self.create_admin()
+        try:
+            report = self.run(admin, options)
+        finally:
+            # Cascades to the orders it created, through delete() so the signals
+            # keep search and stats in sync
+            admin.delete()
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+        if baseline is not None:
+            regressions = self.compare(report, baseline, options["tolerance"])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def run(self, admin, options):
+        order = Order.objects.create(customer=admin, size=Order.SizeChoices.SMALL, quantity=1)
+        token = str(ClaimsTokenObtainPairSerializer.get_token(admin).access_token)
+        send = self.make_sender(options["base_url"], token)
+
+        report = {
+            "target": options["base_url"] or "test-client",
+            "database": settings.DATABASES["default"]["ENGINE"],
+            "orders": Order.objects.count(),
+            "iterations": options["iterations"],
+            "scenarios": {},
+        }
+        # Throttles would turn most timed requests into 429s; a live server needs ORDER_THROTTLES_ENABLED=False
+        with override_settings(ORDER_THROTTLES_ENABLED=False):
+            for name in options["scenarios"] or SCENARIOS:
+                method, path, body = SCENARIOS[name]
+                result = self.run_scenario(send, method, path.format(order=order.pk), body, options)
+                report["scenarios"][name] = result
+                self.stdout.write(
+                    f"{name:<14} {result['rps']:8.1f} req/s  p50 {result['p50_ms']:7.1f}ms  p95 {result['p95_ms']:7.1f}ms  "
+                    f"p99 {result['p99_ms']:7.1f}ms  queries {result['queries']}  errors {result['errors']}"
+                )
+        return report
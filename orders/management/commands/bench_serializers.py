@@ -0,0 +1,82 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework import serializers
+from orders.models import Order
+from orders.serializers import OrderDetailSerializer, compact_order_list
+
+User = get_user_model()
+
+
+# The method-field serializer OrderDetailSerializer replaced, kept for comparison
+class MethodFieldOrderSerializer(serializers.ModelSerializer):
+    size = serializers.SerializerMethodField()
+    order_status = serializers.SerializerMethodField()
+    customer = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Order
+        fields = ['id', 'customer', 'size', 'order_status', 'quantity', 'created_at', 'updated_at']
+
+    def get_size(self, obj):
+        return obj.get_size_display()
+
+    def get_order_status(self, obj):
+        return obj.get_order_status_display()
+
+    def get_customer(self, obj):
+        return {"id": obj.customer.id, "username": obj.customer.username, "email": obj.customer.email}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time serializing unsaved orders with the detail serializers and the compact list path "
+        "(no database access)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=10000, help="Number of orders to serialize")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per serializer, the best one is reported")
+
+    def build_orders(self, count):
+        customer = User(id=1, username="bench", email="bench@example.com")
+        sizes, statuses = Order.SizeChoices.values, Order.StatusChoices.values
+        now = timezone.now()
+        return [
+            Order(
+                id=i, customer=customer, size=sizes[i % len(sizes)], order_status=statuses[i % len(statuses)],
+                quantity=1 + i % 5, created_at=now, updated_at=now,
+            )
+            for i in range(1, count + 1)
+        ]
+
+    def build_rows(self, orders):
+        # What Order.objects.compact() returns for the same orders
+        return [
+            (order.id, order.customer.id, order.customer.username, order.customer.email,
+             order.size, order.order_status, order.quantity, order.created_at, order.updated_at)
+            for order in orders
+        ]
+
+    def handle(self, *args, **options):
+        orders = self.build_orders(options["orders"])
+        rows = self.build_rows(orders)
+        if compact_order_list(rows) != OrderDetailSerializer(orders, many=True).data:
+            raise CommandError("compact_order_list output differs from OrderDetailSerializer")
+        self.stdout.write(f"Serializing {len(orders)} orders, best of {options['repeat']}")
+
+        runs = {
+            "MethodFieldOrderSerializer": lambda: MethodFieldOrderSerializer(orders, many=True).data,
+            "OrderDetailSerializer": lambda: OrderDetailSerializer(orders, many=True).data,
+            "compact_order_list": lambda: compact_order_list(rows),
+        }
+        for name, run in runs.items():
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - started)
+            best = min(timings)
+            self.stdout.write(f"{name:<28} {best:8.3f}s  {best / len(orders) * 1e6:8.1f}us/order")
@@ -0,0 +1,44 @@
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from rest_framework.throttling import UserRateThrottle
+from orders.throttling import SlidingWindowUserRateThrottle
+
+
+class Command(BaseCommand):
+    help = "Compare the cost per check of the throttle engines at a given rate"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rate", default="10000/hour", help="Throttle rate, e.g. 10000/hour")
+        parser.add_argument("--requests", type=int, default=10000, help="Number of simulated requests")
+
+    def run(self, base, rate, requests):
+        throttle_class = type(f"Bench{base.__name__}", (base,), {"scope": "bench", "rate": rate})
+        # Spread the requests evenly over one rate period on a simulated clock
+        clock = [time.time()]
+        step = throttle_class().duration / requests
+        # Fresh ident per run so earlier runs' cache entries don't count
+        request = SimpleNamespace(user=SimpleNamespace(is_authenticated=True, pk=f"bench-{base.__name__}-{clock[0]}"))
+
+        allowed = 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            throttle = throttle_class()
+            throttle.timer = lambda: clock[0]
+            allowed += throttle.allow_request(request, None)
+            clock[0] += step
+        elapsed = time.perf_counter() - started
+
+        return allowed, elapsed
+
+    def handle(self, *args, **options):
+        rate, requests = options["rate"], options["requests"]
+        self.stdout.write(f"{requests} requests at {rate}")
+
+        for base in (UserRateThrottle, SlidingWindowUserRateThrottle):
+            allowed, elapsed = self.run(base, rate, requests)
+            self.stdout.write(
+                f"{base.__name__:<32} allowed {allowed:>6}  total {elapsed:8.3f}s  "
+                f"per check {elapsed / requests * 1e6:8.1f}us"
+            )
@@ -0,0 +1,144 @@
+import re
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import override_settings
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+from orders.models import Order
+
+User = get_user_model()
+
+# Plan lines that mean the orders table is read row by row without an index
+FULL_SCAN_PATTERNS = [
+    re.compile(r"\bSCAN (orders_order|authentication_user)\b(?! USING)"),  # SQLite
+    re.compile(r"Seq Scan on (orders_order|authentication_user)\b"),  # PostgreSQL
+]
+
+# Plan lines that mean the rows are sorted after the fact instead of read in
+# index order, e.g. a tiebreak column the index doesn't hold
+SORT_PATTERNS = [
+    re.compile(r"\bUSE TEMP B-TREE FOR (RIGHT PART OF |LAST TERM OF )?ORDER BY\b"),  # SQLite
+    re.compile(r"^\s*(->\s*)?(Incremental )?Sort\b", re.MULTILINE),  # PostgreSQL
+]
+
+# Nothing is cached and nothing throttled, so every request runs all of its queries
+UNCACHED = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run every query behind each order endpoint, taken from the views themselves, through EXPLAIN "
+        "and fail on full table scans, sorts, or when a query doesn't use the index it was added for"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customer", type=int, default=1, help="Customer id used for the per-user queries")
+        parser.add_argument("--order", type=int, help="Order id used for the detail queries (default: the customer's latest)")
+        parser.add_argument("--page-size", type=int, default=10, help="Page size applied to list queries")
+        parser.add_argument("--search", default="example", help="Search term for the ?search= lists")
+
+    # name -> (path, staff). Paths get ?page_size= added when they are lists
+    def get_endpoints(self, customer, order, search):
+        orders = reverse("orders_list_create")
+        my_orders = reverse("my_orders_list")
+        return {
+            "orders list": (orders, True),
+            "orders list ?status": (f"{orders}?status=pending", True),
+            "orders list ?status&size": (f"{orders}?status=pending&size=large", True),
+            "orders list ?status=open": (f"{orders}?status=open", True),
+            "orders list ?created_after": (f"{orders}?created_after=2024-01-01", True),
+            "orders list ?search": (f"{orders}?search={search}", True),
+            "orders list ?cursor": (f"{orders}?cursor=", True),
+            "my orders": (my_orders, False),
+            "my orders ?status": (f"{my_orders}?status=pending", False),
+            "my orders ?cursor": (f"{my_orders}?cursor=", False),
+            "user orders": (reverse("user_orders_list", args=[customer]), True),
+            "order detail": (reverse("order_retrieve_delete", args=[order]), True),
+            "my order detail": (reverse("my_order_detail", args=[order]), False),
+        }
+
+    # Endpoints whose page query must use one specific index. Any index avoids
+    # a full scan, but e.g. walking order_created_idx past every delivered
+    # order for ?status=open is nearly as bad
+    EXPECTED_INDEXES = {
+        "orders list ?status=open": "order_open_created_idx",
+        "orders list": "order_updated_idx",
+    }
+
+    # Endpoints allowed to sort: full-text matches come back in index order,
+    # so they are sorted, but only the matching orders are
+    ALLOWED_SORTS = {"orders list ?search"}
+
+    def capture(self, path, user, page_size):
+        # Runs the request through the view and returns (alias, sql, params) of every query
+        separator = "&" if "?" in path else "?"
+        request = APIRequestFactory().get(f"{path}{separator}page_size={page_size}")
+        force_authenticate(request, user=user)
+        match = resolve(request.path_info)
+
+        queries = []
+        with ExitStack() as stack:
+            for connection in connections.all():
+                def record(execute, sql, params, many, context, alias=connection.alias):
+                    queries.append((alias, sql, params))
+                    return execute(sql, params, many, context)
+                stack.enter_context(connection.execute_wrapper(record))
+            response = match.func(request, *match.args, **match.kwargs)
+
+        if response.status_code != 200:
+            raise CommandError(f"GET {path} returned {response.status_code}, pick an existing --customer and --order")
+        return queries
+
+    def explain(self, alias, sql, params):
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+
+    def find_problem(self, name, plan):
+        if any(pattern.search(plan) for pattern in FULL_SCAN_PATTERNS):
+            return "FULL SCAN"
+        if name not in self.ALLOWED_SORTS and any(pattern.search(plan) for pattern in SORT_PATTERNS):
+            return "SORT"
+        return None
+
+    def handle(self, *args, **options):
+        customer = options["customer"]
+        staff = User(pk=customer, is_staff=True)
+        owner = User(pk=customer)
+        failures = []
+
+        order = options["order"] or Order.objects.filter(customer_id=customer).values_list("pk", flat=True).first()
+        if order is None:
+            raise CommandError(f"Customer {customer} has no orders, seed some with seed_orders or pick another --customer")
+
+        endpoints = self.get_endpoints(customer, order, options["search"])
+        with override_settings(CACHES=UNCACHED, ORDER_THROTTLES_ENABLED=False, ALLOWED_HOSTS=["testserver"]):
+            captured = {
+                name: self.capture(path, staff if is_staff else owner, options["page_size"])
+                for name, (path, is_staff) in endpoints.items()
+            }
+
+        for name, queries in captured.items():
+            plans = [(sql, self.explain(alias, sql, params)) for alias, sql, params in queries]
+            problems = [(problem, sql, plan) for sql, plan in plans for problem in [self.find_problem(name, plan)] if problem]
+            expected_index = self.EXPECTED_INDEXES.get(name)
+            if not problems and expected_index and not any(expected_index in plan for _, plan in plans):
+                problems = [("NO INDEX", sql, plan) for sql, plan in plans]
+
+            problem = problems[0][0] if problems else None
+            style = self.style.ERROR if problem else self.style.SUCCESS
+            self.stdout.write(style(f"{problem or 'OK':<9} {name} ({len(queries)} queries)"))
+            if problem == "NO INDEX":
+                self.stdout.write(f"expected {expected_index}")
+            for sql, plan in (plans if options["verbosity"] > 1 else [(sql, plan) for _, sql, plan in problems]):
+                self.stdout.write(sql)
+                self.stdout.write(plan)
+            if problem:
+                failures.append(f"{name} ({problem.lower()})")
+
+        if failures:
+            raise CommandError("Unindexed queries: " + ", ".join(failures))
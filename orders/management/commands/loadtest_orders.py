@@ -0,0 +1,72 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.core.management.base import BaseCommand, CommandError
+from orders.benchmarks import percentile
+
+
+# Read endpoints exercised by default, relative to --base-url
+DEFAULT_PATHS = ["/orders/orders/", "/orders/my/orders/"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent GETs at a running server and report requests/sec and latency percentiles. "
+        "Run it once against the WSGI server and once against the ASGI server "
+        "(ORDER_ASYNC_READS=True) to compare the two paths."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="Server to load")
+        parser.add_argument("--path", action="append", dest="paths", help="Path to request, repeatable")
+        parser.add_argument("--token", help="JWT access token sent as a Bearer header")
+        parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once")
+        parser.add_argument("--requests", type=int, default=2000, help="Total requests per path")
+        parser.add_argument("--timeout", type=float, default=10, help="Per-request timeout in seconds")
+
+    def run_path(self, url, options):
+        headers = {"Authorization": f"Bearer {options['token']}"} if options["token"] else {}
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=options["concurrency"], pool_maxsize=options["concurrency"])
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        def fetch(_):
+            started = time.perf_counter()
+            try:
+                status_code = session.get(url, headers=headers, timeout=options["timeout"]).status_code
+            except requests.RequestException:
+                status_code = None
+            return time.perf_counter() - started, status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(fetch, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, status_code in results if status_code is None or status_code >= 400)
+        return {
+            "rps": len(results) / elapsed,
+            "p50": percentile(latencies, 50) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "mean": statistics.fmean(latencies) * 1000,
+            "errors": errors,
+        }
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("--concurrency and --requests must be positive")
+
+        paths = options["paths"] or DEFAULT_PATHS
+        self.stdout.write(f"{options['requests']} requests per path, concurrency {options['concurrency']}")
+        for path in paths:
+            url = options["base_url"].rstrip("/") + path
+            result = self.run_path(url, options)
+            self.stdout.write(
+                f"{path:<28} {result['rps']:8.1f} req/s  p50 {result['p50']:7.1f}ms  "
+                f"p99 {result['p99']:7.1f}ms  mean {result['mean']:7.1f}ms  errors {result['errors']}"
+            )
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from orders import write_behind
+
+
+class Command(BaseCommand):
+    help = (
+        "Persist orders accepted in write-behind mode (ORDER_WRITE_BEHIND) from the local queue "
+        "in batches. Run a single worker next to the web processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.ORDER_QUEUE_BATCH_SIZE, help="Orders per bulk_create")
+        parser.add_argument("--interval", type=float, default=0.5, help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        requeued = write_behind.requeue_stale()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} orders left in processing by a previous worker")
+        self.stdout.write(f"{write_behind.pending_count()} orders pending")
+
+        purged_at = 0
+        try:
+            while True:
+                entries = write_behind.claim(options["batch_size"])
+                if entries:
+                    persisted, failed = write_behind.persist(entries)
+                    self.stdout.write(f"Persisted {persisted} orders, {failed} failed")
+                    continue
+                if options["once"]:
+                    break
+
+                if time.monotonic() - purged_at > 3600:
+                    write_behind.purge(settings.ORDER_QUEUE_RETENTION)
+                    purged_at = time.monotonic()
+                # Like the end of a request: drop connections past CONN_MAX_AGE or broken
+                close_old_connections()
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from orders import idempotency
+
+
+class Command(BaseCommand):
+    help = "Delete Idempotency-Key responses older than IDEMPOTENCY_TTL. Run it periodically, e.g. hourly from cron."
+
+    def handle(self, *args, **options):
+        purged = idempotency.purge()
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} idempotency key(s)"))
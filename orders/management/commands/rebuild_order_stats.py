@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from orders import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the order stats counters from the orders table and report any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Only compare, fail if the counters drifted")
+
+    def handle(self, *args, **options):
+        live = stats.live_counters()
+        drift = stats.diff_counters(live, stats.stored_counters())
+
+        for (bucket, size, order_status), (expected, actual) in sorted(drift.items()):
+            self.stdout.write(
+                f"{bucket:%Y-%m-%d %H:00} {size:<12} {order_status:<11} "
+                f"expected {expected[0]} orders/{expected[1]} qty, stored {actual[0]}/{actual[1]}"
+            )
+
+        if options["check"]:
+            if drift:
+                raise CommandError(f"{len(drift)} counter(s) out of sync")
+            self.stdout.write(self.style.SUCCESS("Counters match the orders table"))
+            return
+
+        stats.rebuild_counters(live)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(live)} counter(s), fixed {len(drift)}"))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from orders.benchmarks import BENCH_PASSWORD, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Create N customers and M orders with a realistic status, size and quantity mix "
+        "for benchmarks and load tests. Customers log in as bench<id>@example.com."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100, help="Customers to create")
+        parser.add_argument("--orders", type=int, default=10000, help="Orders to create, spread over the customers")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, same seed gives the same data")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per INSERT")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["orders"] < 0 or options["batch_size"] < 1:
+            raise CommandError("--users and --batch-size must be positive, --orders can't be negative")
+
+        started = time.perf_counter()
+        customers, created = seed(options["users"], options["orders"], options["seed"], options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(customers)} customers and {created} orders in {time.perf_counter() - started:.1f}s "
+            f"(password {BENCH_PASSWORD!r})"
+        ))
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-17 11:20
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE orders_order_search USING fts5(username, email, size, order_status, prefix='2 3')"
+        )
+        schema_editor.execute(
+            "INSERT INTO orders_order_search (rowid, username, email, size, order_status) "
+            "SELECT o.id, u.username, u.email, o.size, o.order_status "
+            "FROM orders_order o JOIN authentication_user u ON u.id = o.customer_id"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE orders_order_search ("
+            "order_id integer PRIMARY KEY REFERENCES orders_order (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute("CREATE INDEX orders_order_search_document_idx ON orders_order_search USING GIN (document)")
+        schema_editor.execute(
+            "INSERT INTO orders_order_search (order_id, document) "
+            "SELECT o.id, to_tsvector('simple', u.username || ' ' || u.email || ' ' || o.size || ' ' || o.order_status) "
+            "FROM orders_order o JOIN authentication_user u ON u.id = o.customer_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS orders_order_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_indexes'),
+        ('authentication', '0003_user_username_folded_user_email_folded'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
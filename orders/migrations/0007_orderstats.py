@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-17 14:32
+
+from datetime import timezone
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+
+
+def build_counters(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderStats = apps.get_model('orders', 'OrderStats')
+    db = schema_editor.connection.alias
+    rows = (
+        Order.objects.using(db).order_by()
+        .annotate(bucket=TruncHour('created_at', tzinfo=timezone.utc))
+        .values('bucket', 'size', 'order_status')
+        .annotate(order_count=Count('id'), quantity_total=Sum('quantity'))
+    )
+    OrderStats.objects.using(db).bulk_create([OrderStats(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('size', models.CharField(choices=[('SMALL', 'Small'), ('MEDIUM', 'Medium'), ('LARGE', 'Large'), ('EXTRA_LARGE', 'Extra Large')], max_length=20)),
+                ('order_status', models.CharField(choices=[('PENDING', 'Pending'), ('IN_TRANSIT', 'In Transit'), ('DELIVERED', 'Delivered')], max_length=20)),
+                ('order_count', models.IntegerField(default=0)),
+                ('quantity_total', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'size', 'order_status'), name='order_stats_bucket_unique')],
+            },
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_orderstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='tracking_id',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True),
+        ),
+    ]
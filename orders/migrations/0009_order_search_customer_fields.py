@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-17 18:10
+
+from django.db import migrations
+
+
+# The search index only holds the customer's username and email; size and
+# status made ?search=large or ?search=pending match every such order
+def build_search_index(schema_editor, order_columns):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        columns = ', '.join(['username', 'email', *order_columns])
+        values = ', '.join(['u.username', 'u.email', *(f'o.{column}' for column in order_columns)])
+        schema_editor.execute("DROP TABLE IF EXISTS orders_order_search")
+        schema_editor.execute(f"CREATE VIRTUAL TABLE orders_order_search USING fts5({columns}, prefix='2 3')")
+        schema_editor.execute(
+            f"INSERT INTO orders_order_search (rowid, {columns}) SELECT o.id, {values} "
+            "FROM orders_order o JOIN authentication_user u ON u.id = o.customer_id"
+        )
+    elif vendor == 'postgresql':
+        document = " || ' ' || ".join(['u.username', 'u.email', *(f'o.{column}' for column in order_columns)])
+        schema_editor.execute(
+            "UPDATE orders_order_search s "
+            f"SET document = to_tsvector('simple', {document}) "
+            "FROM orders_order o JOIN authentication_user u ON u.id = o.customer_id WHERE o.id = s.order_id"
+        )
+
+
+def customer_fields_only(apps, schema_editor):
+    build_search_index(schema_editor, [])
+
+
+def with_order_fields(apps, schema_editor):
+    build_search_index(schema_editor, ['size', 'order_status'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_order_tracking_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(customer_fields_only, with_order_fields),
+    ]
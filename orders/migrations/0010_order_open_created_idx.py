@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_order_search_customer_fields'),
+    ]
+
+    # Led by order_status, the index couldn't return open orders newest first,
+    # so the planner walked order_created_idx past every delivered order instead
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_open_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('order_status', 'DELIVERED'), _negated=True), fields=['-created_at'], name='order_open_created_idx'),
+        ),
+    ]
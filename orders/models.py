@@ -4,6 +4,35 @@ from django.contrib.auth import get_user_model
 # Create your models here.
 User = get_user_model()
 
+
+class OrderQuerySet(models.QuerySet):
+
+    # Columns emitted by the detail/list serializers
+    LIST_FIELDS = [
+        'id', 'size', 'order_status', 'quantity', 'created_at', 'updated_at',
+        'customer__id', 'customer__username', 'customer__email',
+    ]
+
+    def for_listing(self):
+        # Join the customer in the same query and skip columns nobody reads
+        return self.select_related('customer').only(*self.LIST_FIELDS)
+
+    # Row order expected by serializers.compact_order_list
+    COMPACT_FIELDS = [
+        'id', 'customer_id', 'customer__username', 'customer__email',
+        'size', 'order_status', 'quantity', 'created_at', 'updated_at',
+    ]
+
+    def compact(self):
+        # Plain rows with the customer joined in; named so cursor pagination can read created_at
+        return self.values_list(*self.COMPACT_FIELDS, named=True)
+
+
+# Raised by a conditional save whose row was updated since it was loaded
+class OrderChanged(Exception):
+    pass
+
+
 class Order(models.Model):
    
     class SizeChoices(models.TextChoices):
@@ -17,15 +46,109 @@ class Order(models.Model):
         IN_TRANSIT = "IN_TRANSIT", "In Transit"
         DELIVERED = "DELIVERED", "Delivered"
 
+    # Allowed status transitions: target -> status the order must currently have
+    STATUS_TRANSITIONS = {
+        StatusChoices.IN_TRANSIT: StatusChoices.PENDING,
+        StatusChoices.DELIVERED: StatusChoices.IN_TRANSIT,
+    }
+
     customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     size = models.CharField(max_length=20, choices=SizeChoices.choices, default=SizeChoices.SMALL)
     order_status = models.CharField(max_length=20, choices=StatusChoices.choices, default=StatusChoices.PENDING)
     quantity = models.PositiveIntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Write-behind tracking id, so a requeued queue entry is never persisted twice
+    tracking_id = models.CharField(max_length=32, unique=True, null=True, blank=True, editable=False)
+
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
+        # Lists are newest first; the id tiebreak of cursor pages
+        # (views.OrderCursorPagination) is part of every such index too
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="order_created_idx"),
+            models.Index(fields=["customer", "-created_at", "-id"], name="order_customer_created_idx"),
+            models.Index(fields=["order_status", "-created_at", "-id"], name="order_status_created_idx"),
+            models.Index(fields=["order_status", "size", "-created_at", "-id"], name="order_status_size_created_idx"),
+            # Latest update of the unfiltered list (conditional.list_summary)
+            models.Index(fields=["updated_at"], name="order_updated_idx"),
+            # ?status=open lists only hold orders that are still open, newest first
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="order_open_created_idx",
+                condition=~models.Q(order_status="DELIVERED"),
+            ),
+        ]
+
+    # Version the next save() must still find in the row (conditional.save_if_unchanged)
+    expected_updated_at = None
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update, *args, **kwargs):
+        if self.expected_updated_at is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update, *args, **kwargs)
+        base_qs = base_qs.filter(updated_at=self.expected_updated_at)
+        updated = super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update, *args, **kwargs)
+        if not updated:
+            # Instead of save() falling back to an INSERT
+            raise OrderChanged()
+        return updated
+
+    # Fields the stats counters are keyed on, remembered as loaded from the database
+    TRACKED_FIELDS = ("size", "order_status", "quantity", "created_at")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.TRACKED_FIELDS and value is not models.DEFERRED
+        }
+        # The search index only changes when the order moves to another customer
+        instance._loaded_customer_id = instance.__dict__.get("customer_id")
+        return instance
+
+    def __str__(self):
+        return f"Order #{self.id} | {self.get_size_display()} | Customer {self.customer.id}"
+
+
+# Per-hour order counters, maintained incrementally (see orders/stats.py)
+class OrderStats(models.Model):
+    bucket = models.DateTimeField()
+    size = models.CharField(max_length=20, choices=Order.SizeChoices.choices)
+    order_status = models.CharField(max_length=20, choices=Order.StatusChoices.choices)
+    order_count = models.IntegerField(default=0)
+    quantity_total = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-bucket"]
+        constraints = [
+            models.UniqueConstraint(fields=["bucket", "size", "order_status"], name="order_stats_bucket_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket:%Y-%m-%d %H:00} | {self.size} | {self.order_status} | {self.order_count}"
+
+
+# Responses stored for Idempotency-Key retries (see orders/idempotency.py). The
+# unique (user, scope) row is also the lock: it has no status_code while the
+# first request is still running
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    scope = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=64)
+    token = models.CharField(max_length=32)
+    locked_until = models.DateTimeField(null=True)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    content = models.BinaryField(default=b'')
+    headers = models.JSONField(default=dict)
+    created_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "scope"], name="idempotency_key_user_scope_unique"),
+        ]
 
     def __str__(self):
-        return f"Order #{self.id} | {self.get_size_display()} | Customer {self.customer.id}"
\ No newline at end of file
+        return f"{self.user_id} | {self.scope} | {self.status_code or 'running'}"
@@ -0,0 +1,94 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+
+SEARCH_TABLE = "orders_order_search"
+FULL_TEXT_VENDORS = ("sqlite", "postgresql")
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def full_text_enabled():
+    return getattr(settings, "ORDER_SEARCH_FULL_TEXT", True) and connection.vendor in FULL_TEXT_VENDORS
+
+
+def prefix_range(field, prefix):
+    # field >= prefix AND field < next prefix, so a plain b-tree index is used
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f"{field}__gte": prefix, f"{field}__lt": upper})
+
+
+# Index maintenance. Only the customer's username and email are indexed,
+# ids are matched directly and status/size have their own filters
+
+def index_orders(orders, customer=None):
+    if not full_text_enabled() or not orders:
+        return
+    rows = []
+    for order in orders:
+        owner = customer or order.customer
+        rows.append([order.pk, owner.username, owner.email])
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [row[:1] for row in rows])
+            cursor.executemany(f"INSERT INTO {SEARCH_TABLE} (rowid, username, email) VALUES (%s, %s, %s)", rows)
+        else:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (order_id, document) VALUES (%s, to_tsvector('simple', %s)) "
+                "ON CONFLICT (order_id) DO UPDATE SET document = EXCLUDED.document",
+                [[row[0], " ".join(row[1:])] for row in rows],
+            )
+
+
+def index_order(order, customer=None):
+    index_orders([order], customer=customer)
+
+
+def remove_order(order_id):
+    if not full_text_enabled():
+        return
+    column = "rowid" if connection.vendor == "sqlite" else "order_id"
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE {column} = %s", [order_id])
+
+
+def reindex_customer(user):
+    index_orders(list(user.orders.only("id")), customer=user)
+
+
+# Querying
+
+def full_text_match(tokens):
+    if connection.vendor == "sqlite":
+        query = " ".join(f'"{token}"*' for token in tokens)
+        sql = f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s"
+    else:
+        query = " & ".join(f"{token}:*" for token in tokens)
+        sql = f"SELECT order_id FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('simple', %s)"
+    return Q(pk__in=RawSQL(sql, [query]))
+
+
+def search_orders(orders, term, customers=False):
+    term = term.strip()
+    if not term:
+        return orders
+
+    # Numbers are order ids
+    if term.isdigit():
+        return orders.filter(pk=int(term))
+    if not customers:
+        return orders.none()
+
+    folded = term.casefold()
+    tokens = TOKEN_RE.findall(folded)
+    if full_text_enabled() and tokens:
+        return orders.filter(full_text_match(tokens))
+
+    return orders.filter(
+        prefix_range("customer__username_folded", folded) | prefix_range("customer__email_folded", folded)
+    )
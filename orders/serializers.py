@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from types import MappingProxyType
+from pizza.metrics import timing
 from .models import Order
 
 
@@ -6,15 +8,72 @@ class DummySerializer(serializers.Serializer):
     pass
 
 
-def  mappping_choice(value,choices,field_name):
+# Case-folded value/label -> value tables, built once at import
+def build_choice_lookup(choices):
+    lookup = {}
     for choice in choices:
-        if value.lower() == choice.label.lower():
-            return choice.value
-    raise serializers.ValidationError(f"Invalid {field_name} '{value}' . Must be one of: " + ", ".join(c.label for c in choices))          
+        lookup[choice.value.casefold()] = choice.value
+        lookup[choice.label.casefold()] = choice.value
+    return MappingProxyType(lookup)
+
+
+CHOICE_LOOKUPS = MappingProxyType({
+    Order.SizeChoices: build_choice_lookup(Order.SizeChoices),
+    Order.StatusChoices: build_choice_lookup(Order.StatusChoices),
+})
+
+CHOICE_LABELS = MappingProxyType({
+    Order.SizeChoices: MappingProxyType(dict(Order.SizeChoices.choices)),
+    Order.StatusChoices: MappingProxyType(dict(Order.StatusChoices.choices)),
+})
+
+
+def  mappping_choice(value,choices,field_name):
+    try:
+        return CHOICE_LOOKUPS[choices][value.strip().casefold()]
+    except KeyError:
+        raise serializers.ValidationError(f"Invalid {field_name} '{value}' . Must be one of: " + ", ".join(CHOICE_LABELS[choices].values()))
+
+
+# Renders a stored choice value as its label
+class ChoiceLabelField(serializers.ReadOnlyField):
+    def __init__(self, choices, **kwargs):
+        self.labels = CHOICE_LABELS[choices]
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return self.labels.get(value, value)
+
+
+DATETIME_FIELD = serializers.DateTimeField()
+
+
+# Reports validation and rendering time to the request metrics, once per
+# is_valid() or .data call rather than for every row and nested serializer
+class TimedSerializerMixin:
+    def is_valid(self, *args, **kwargs):
+        with timing("serializer"):
+            return super().is_valid(*args, **kwargs)
+
+    @property
+    def data(self):
+        with timing("serializer"):
+            return super().data
+
+
+# list_serializer_class for serializers used with many=True
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class OrderCustomerSerializer(TimedSerializerMixin, serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    username = serializers.CharField(read_only=True)
+    email = serializers.EmailField(read_only=True)
 
 
 # Create Serializer
-class OrderCreationSerializer(serializers.ModelSerializer):
+class OrderCreationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     size = serializers.CharField(max_length=20,help_text="Enter size as Small, Medium, Large, or Extra Large")
     order_status = serializers.HiddenField(default=Order.StatusChoices.PENDING)
     quantity = serializers.IntegerField(min_value=1,help_text="Must be at least 1")
@@ -29,31 +88,41 @@ class OrderCreationSerializer(serializers.ModelSerializer):
 
 
 #  Detail / List Serializer
-class OrderDetailSerializer(serializers.ModelSerializer):
-    size = serializers.SerializerMethodField()
-    order_status = serializers.SerializerMethodField()
-    customer = serializers.SerializerMethodField()
+class OrderDetailSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    size = ChoiceLabelField(Order.SizeChoices)
+    order_status = ChoiceLabelField(Order.StatusChoices)
+    customer = OrderCustomerSerializer(read_only=True)
 
     class Meta:
         model = Order
         fields = ['id', 'customer','size', 'order_status', 'quantity', 'created_at', 'updated_at']
-
-    def get_size(self, obj):
-        return obj.get_size_display()
-
-    def get_order_status(self, obj):
-        return obj.get_order_status_display()
-    
-    def get_customer(self,obj):
-        return {
-            "id":obj.customer.id,
-            "username":obj.customer.username,
-            "email":obj.customer.email
-        }
+        list_serializer_class = TimedListSerializer
+
+
+# Read-only fast path for order lists: maps Order.objects.compact() rows to
+# exactly what OrderDetailSerializer(many=True).data holds, without building
+# the DRF field pipeline for every row
+def compact_order_list(rows):
+    size_labels = CHOICE_LABELS[Order.SizeChoices]
+    status_labels = CHOICE_LABELS[Order.StatusChoices]
+    to_datetime = DATETIME_FIELD.to_representation
+    with timing("serializer"):
+        return [
+            {
+                "id": order_id,
+                "customer": {"id": customer_id, "username": username, "email": email},
+                "size": size_labels.get(size, size),
+                "order_status": status_labels.get(order_status, order_status),
+                "quantity": quantity,
+                "created_at": to_datetime(created_at),
+                "updated_at": to_datetime(updated_at),
+            }
+            for order_id, customer_id, username, email, size, order_status, quantity, created_at, updated_at in rows
+        ]
 
 
 # Update Status Only Serializer 
-class OrderStatusUpdateSerializer(serializers.ModelSerializer):
+class OrderStatusUpdateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     order_status = serializers.CharField(
         help_text="Enter status as Pending, In Transit, or Delivered"
     )
@@ -68,7 +137,7 @@ class OrderStatusUpdateSerializer(serializers.ModelSerializer):
 
 
 # Full Update Serializer
-class OrderUpdateSerializer(serializers.ModelSerializer):
+class OrderUpdateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     size = serializers.CharField(max_length=20,help_text="Enter size as Small, Medium, Large, or Extra Large")
     order_status = serializers.CharField(help_text="Enter status as Pending, In Transit, or Delivered")
     quantity = serializers.IntegerField(min_value=1,help_text="Must be at least 1")
@@ -83,3 +152,34 @@ class OrderUpdateSerializer(serializers.ModelSerializer):
 
     def validate_order_status(self, value):
         return mappping_choice(value, Order.StatusChoices, "status")
+
+
+
+# Bulk status transition Serializer
+class OrderFilterSerializer(TimedSerializerMixin, serializers.Serializer):
+    status = serializers.CharField(required=False)
+    size = serializers.CharField(required=False)
+    search = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        # An empty filter would match every order
+        if not attrs:
+            raise serializers.ValidationError("Provide at least one of 'status', 'size' or 'search'.")
+        return attrs
+
+
+class OrderBulkStatusSerializer(TimedSerializerMixin, serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    filter = OrderFilterSerializer(required=False)
+    order_status = serializers.CharField(help_text="Enter status as In Transit or Delivered")
+
+    def validate_order_status(self, value):
+        value = mappping_choice(value, Order.StatusChoices, "status")
+        if value not in Order.STATUS_TRANSITIONS:
+            raise serializers.ValidationError(f"Orders cannot be moved back to '{value}'.")
+        return value
+
+    def validate(self, attrs):
+        if ("ids" in attrs) == ("filter" in attrs):
+            raise serializers.ValidationError("Provide either 'ids' or 'filter'.")
+        return attrs
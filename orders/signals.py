@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Order
+from django.db import transaction
+from . import search, stats, events, conditional
+from .cache import invalidate_order_detail
+
+User = get_user_model()
+
+
+# Keep the order search index, detail cache and stats counters in sync
+@receiver(pre_save, sender=Order)
+def order_saving(sender, instance, **kwargs):
+    instance._previous_values = stats.previous_values(instance)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    if created or getattr(instance, "_loaded_customer_id", None) != instance.customer_id:
+        search.index_order(instance)
+    invalidate_order_detail(instance.pk)
+    stats.record_saved(instance, getattr(instance, "_previous_values", None))
+
+    # Push status changes to SSE subscribers once the change is committed
+    previous = getattr(instance, "_previous_values", None)
+    if previous is not None and previous["order_status"] != instance.order_status:
+        transaction.on_commit(
+            lambda: events.publish_status(instance.pk, instance.order_status, instance.updated_at)
+        )
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    search.remove_order(instance.pk)
+    invalidate_order_detail(instance.pk)
+    stats.record_deleted(instance)
+
+
+# Orders only carry the customer's username and email (search index, detail
+# payloads); other saves such as last_login or a password rehash skip the reindex
+CUSTOMER_FIELDS = ("username", "email")
+
+
+@receiver(pre_save, sender=User)
+def customer_saving(sender, instance, update_fields=None, **kwargs):
+    instance._customer_changed = False
+    if instance._state.adding:
+        return
+    if update_fields is not None and not set(CUSTOMER_FIELDS) & set(update_fields):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list(*CUSTOMER_FIELDS).first()
+    instance._customer_changed = previous != tuple(getattr(instance, field) for field in CUSTOMER_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def customer_saved(sender, instance, created, **kwargs):
+    if not created and getattr(instance, "_customer_changed", False):
+        search.reindex_customer(instance)
+        invalidate_order_detail(*instance.orders.values_list("id", flat=True))
+        conditional.customer_changed()
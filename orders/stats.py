@@ -0,0 +1,182 @@
+from datetime import timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour
+from .models import Order, OrderStats
+
+
+def hour_bucket(value):
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def order_key(values):
+    return (hour_bucket(values["created_at"]), values["size"], values["order_status"])
+
+
+# Counter updates
+
+def apply_deltas(deltas):
+    # deltas: {(bucket, size, status): (count delta, quantity delta)}
+    for (bucket, size, order_status), (count, quantity) in deltas.items():
+        if not count and not quantity:
+            continue
+        rows = OrderStats.objects.filter(bucket=bucket, size=size, order_status=order_status)
+        if rows.update(order_count=F("order_count") + count, quantity_total=F("quantity_total") + quantity):
+            continue
+        try:
+            with transaction.atomic():
+                OrderStats.objects.create(
+                    bucket=bucket, size=size, order_status=order_status, order_count=count, quantity_total=quantity
+                )
+        except IntegrityError:
+            # Another worker created the row first
+            rows.update(order_count=F("order_count") + count, quantity_total=F("quantity_total") + quantity)
+
+
+def merge(deltas, key, count, quantity):
+    old_count, old_quantity = deltas.get(key, (0, 0))
+    deltas[key] = (old_count + count, old_quantity + quantity)
+
+
+def current_values(order):
+    return {name: getattr(order, name) for name in Order.TRACKED_FIELDS}
+
+
+def previous_values(order):
+    if order._state.adding:
+        return None
+    values = getattr(order, "_loaded_values", {})
+    if len(values) < len(Order.TRACKED_FIELDS):
+        values = Order.objects.filter(pk=order.pk).values(*Order.TRACKED_FIELDS).first()
+    return dict(values) if values else None
+
+
+def record_saved(order, previous):
+    deltas = {}
+    if previous is not None:
+        merge(deltas, order_key(previous), -1, -previous["quantity"])
+    values = current_values(order)
+    merge(deltas, order_key(values), 1, values["quantity"])
+    apply_deltas(deltas)
+    order._loaded_values = values
+
+
+def record_deleted(order):
+    # Prefer the loaded values, the row is already gone so deferred fields can't be fetched
+    values = getattr(order, "_loaded_values", {})
+    if len(values) < len(Order.TRACKED_FIELDS):
+        values = current_values(order)
+    apply_deltas({order_key(values): (-1, -values["quantity"])})
+
+
+def record_created(orders):
+    # For bulk_create, which skips the Order signals
+    deltas = {}
+    for order in orders:
+        values = current_values(order)
+        merge(deltas, order_key(values), 1, values["quantity"])
+        order._loaded_values = values
+    apply_deltas(deltas)
+
+
+def record_transition(order_ids, previous_status, new_status):
+    # For queryset.update() status changes, which skip the Order signals
+    deltas = {}
+    rows = (
+        Order.objects.filter(pk__in=order_ids)
+        .order_by()
+        .annotate(bucket=TruncHour("created_at", tzinfo=dt_timezone.utc))
+        .values("bucket", "size")
+        .annotate(order_count=Count("id"), quantity_total=Sum("quantity"))
+    )
+    for row in rows:
+        merge(deltas, (row["bucket"], row["size"], previous_status), -row["order_count"], -row["quantity_total"])
+        merge(deltas, (row["bucket"], row["size"], new_status), row["order_count"], row["quantity_total"])
+    apply_deltas(deltas)
+
+
+# Rebuilding
+
+def live_counters():
+    rows = (
+        Order.objects.order_by()
+        .annotate(bucket=TruncHour("created_at", tzinfo=dt_timezone.utc))
+        .values("bucket", "size", "order_status")
+        .annotate(order_count=Count("id"), quantity_total=Sum("quantity"))
+    )
+    return {
+        (row["bucket"], row["size"], row["order_status"]): (row["order_count"], row["quantity_total"])
+        for row in rows
+    }
+
+
+def stored_counters():
+    return {
+        (row.bucket, row.size, row.order_status): (row.order_count, row.quantity_total)
+        for row in OrderStats.objects.all()
+        if row.order_count or row.quantity_total
+    }
+
+
+def diff_counters(expected, actual):
+    keys = set(expected) | set(actual)
+    return {
+        key: (expected.get(key, (0, 0)), actual.get(key, (0, 0)))
+        for key in keys if expected.get(key, (0, 0)) != actual.get(key, (0, 0))
+    }
+
+
+@transaction.atomic
+def rebuild_counters(counters):
+    OrderStats.objects.all().delete()
+    OrderStats.objects.bulk_create(
+        [
+            OrderStats(bucket=bucket, size=size, order_status=order_status, order_count=count, quantity_total=quantity)
+            for (bucket, size, order_status), (count, quantity) in counters.items()
+        ],
+        batch_size=1000,
+    )
+
+
+# Reading
+
+def add(table, key, count, quantity):
+    slot = table.setdefault(key, [0, 0])
+    slot[0] += count
+    slot[1] += quantity
+
+
+def summarize(since=None, until=None, bucket="hour"):
+    rows = OrderStats.objects.filter(order_count__gt=0)
+    if since is not None:
+        rows = rows.filter(bucket__gte=since)
+    if until is not None:
+        rows = rows.filter(bucket__lt=until)
+
+    totals, by_status, by_size, by_status_size, timeline = {}, {}, {}, {}, {}
+    for row_bucket, size, order_status, count, quantity in rows.values_list(
+        "bucket", "size", "order_status", "order_count", "quantity_total"
+    ):
+        if bucket == "day":
+            row_bucket = row_bucket.replace(hour=0)
+        add(totals, "all", count, quantity)
+        add(by_status, order_status, count, quantity)
+        add(by_size, size, count, quantity)
+        add(by_status_size, (order_status, size), count, quantity)
+        add(timeline, row_bucket, count, quantity)
+
+    count, quantity = totals.get("all", (0, 0))
+    return {
+        "totals": {"orders": count, "quantity": quantity},
+        "by_status": {key: {"orders": c, "quantity": q} for key, (c, q) in by_status.items()},
+        "by_size": {key: {"orders": c, "quantity": q} for key, (c, q) in by_size.items()},
+        "by_status_size": [
+            {"order_status": order_status, "size": size, "orders": c, "quantity": q}
+            for (order_status, size), (c, q) in sorted(by_status_size.items())
+        ],
+        "timeline": [
+            {"bucket": key.isoformat(), "orders": c, "quantity": q}
+            for key, (c, q) in sorted(timeline.items())
+        ],
+    }
@@ -1,3 +1,1082 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import io
+import json
+import os
+import runpy
+import tempfile
+from decimal import Decimal
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from decouple import AutoConfig, UndefinedValueError
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import AsyncClient, AsyncRequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from authentication.tokens import ClaimsTokenObtainPairSerializer
+from pizza import schema
+from pizza.asgi import application
+from pizza.metrics import timing
+from pizza.renderers import FastJSONParser, FastJSONRenderer, orjson
+from . import async_views, benchmarks, events, search, stats, write_behind
+from . import cache as order_cache
+from .idempotency import IdempotentRequest
+from .models import IdempotencyKey, Order
+from .serializers import OrderDetailSerializer, OrderStatusUpdateSerializer, OrderUpdateSerializer, compact_order_list
+from .throttling import OrderBulkCreateThrottle, SlidingWindowUserRateThrottle, get_throttle_engine
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_user(username, **extra):
+    phone_number = f'+1202555{User.objects.count():04d}'
+    return User.objects.create_user(f'{username}@example.com', username, phone_number, password='pass', **extra)
+
+
+# Clients authenticate with real access tokens so request.user is the ClaimsUser
+# the API sees in production
+@override_settings(CACHES=LOCMEM_CACHE, ORDER_THROTTLES_ENABLED=False, JWT_REVOCATION_CHECK=False, METRICS_SAMPLE_RATE=0)
+class OrderAPITestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.customer = create_user('alice')
+        self.admin = create_user('admin', is_staff=True)
+        self.client = self.client_for(self.customer)
+        self.admin_client = self.client_for(self.admin)
+
+    def client_for(self, user):
+        client = APIClient()
+        token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def create_orders(self, count, customer=None, **fields):
+        orders = Order.objects.bulk_create([
+            Order(customer=customer or self.customer, quantity=1, **fields) for _ in range(count)
+        ])
+        # Like the app's bulk_create paths
+        stats.record_created(orders)
+        return orders
+
+
+class OwnerAccessTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.order, = self.create_orders(1)
+
+    def test_owner_can_view_their_order(self):
+        response = self.client.get(f'/orders/my/orders/{self.order.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.order.pk)
+
+    def test_owner_can_list_their_orders(self):
+        response = self.client.get('/orders/my/orders/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([order['id'] for order in response.json()['results']], [self.order.pk])
+
+    def test_owner_can_update_their_order(self):
+        response = self.client.put(f'/orders/orders/{self.order.pk}/update/', {'size': 'Large', 'order_status': 'Pending', 'quantity': 3}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.quantity, 3)
+
+    def test_other_customer_cannot_view_or_update(self):
+        other = self.client_for(create_user('bob'))
+        self.assertEqual(other.get(f'/orders/my/orders/{self.order.pk}/').status_code, 404)
+        response = other.put(f'/orders/orders/{self.order.pk}/update/', {'size': 'Large', 'order_status': 'Pending', 'quantity': 3}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class WriteBehindTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(ORDER_WRITE_BEHIND=True, ORDER_QUEUE_PATH=f'{directory.name}/orders.sqlite3')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(self.close_queue)
+
+    def close_queue(self):
+        # The queue connection is kept per thread
+        connection = getattr(write_behind._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            del write_behind._local.connection
+
+    def test_create_is_queued_and_tracked_by_the_owner(self):
+        response = self.client.post('/orders/orders/', {'size': 'Large', 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, 202)
+        tracking_id = response.json()['tracking_id']
+        self.assertFalse(Order.objects.exists())
+
+        response = self.client.get(f'/orders/orders/queued/{tracking_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['state'], write_behind.QUEUED)
+        other = self.client_for(create_user('bob'))
+        self.assertEqual(other.get(f'/orders/orders/queued/{tracking_id}/').status_code, 404)
+
+        self.assertEqual(write_behind.persist(write_behind.claim(10)), (1, 0))
+        order = Order.objects.get()
+        self.assertEqual((order.customer_id, order.size, order.quantity), (self.customer.pk, 'LARGE', 2))
+        response = self.client.get(f'/orders/orders/queued/{tracking_id}/')
+        self.assertEqual((response.json()['state'], response.json()['order_id']), (write_behind.PERSISTED, order.pk))
+
+    def test_requeued_entries_are_not_persisted_twice(self):
+        self.client.post('/orders/orders/', {'size': 'Large', 'quantity': 2}, format='json')
+        entries = write_behind.claim(10)
+        write_behind.persist(entries)
+        # A worker that crashed after committing but before marking the batch
+        write_behind.get_connection().execute("UPDATE queued_order SET state = ?", (write_behind.PROCESSING,))
+        self.assertEqual(write_behind.requeue_stale(), 1)
+
+        self.assertEqual(write_behind.persist(write_behind.claim(10)), (1, 0))
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(write_behind.pending_count(), 0)
+
+
+# The replica is a second, empty SQLite file: a read that reaches it finds no
+# orders. Transactional so the router does not see the test case's atomic block
+@skipIf('replica' in settings.DATABASES, 'DB_REPLICA_NAME is set, the test brings its own replica')
+@override_settings(CACHES=LOCMEM_CACHE, ORDER_THROTTLES_ENABLED=False, JWT_REVOCATION_CHECK=False, METRICS_SAMPLE_RATE=0)
+class ReplicaRoutingTests(TransactionTestCase):
+    # Resolved in setUpClass, once the replica alias exists
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        replica = {**settings.DATABASES['default'], 'NAME': f'{directory.name}/replica.sqlite3'}
+        databases = mock.patch.dict(settings.DATABASES, {'replica': replica})
+        databases.start()
+        cls.addClassCleanup(databases.stop)
+        cls.addClassCleanup(cls.drop_replica)
+        call_command('migrate', database='replica', verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def drop_replica(cls):
+        connections['replica'].close()
+        del connections['replica']
+
+    def setUp(self):
+        cache.clear()
+        self.customer = create_user('alice')
+        self.order = Order.objects.create(customer=self.customer, quantity=1)
+
+    def client_for(self, user):
+        return OrderAPITestCase.client_for(self, user)
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertTrue(Order.objects.filter(pk=self.order.pk).exists())
+
+    def test_safe_requests_read_the_replica(self):
+        response = self.client_for(self.customer).get(f'/orders/my/orders/{self.order.pk}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_unsafe_requests_read_the_primary(self):
+        client = self.client_for(self.customer)
+        response = client.put(f'/orders/orders/{self.order.pk}/update/', {'size': 'Large', 'order_status': 'Pending', 'quantity': 3}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['quantity'], 3)
+
+    def test_writers_are_pinned_to_the_primary(self):
+        client = self.client_for(self.customer)
+        client.put(f'/orders/orders/{self.order.pk}/update/', {'size': 'Large', 'order_status': 'Pending', 'quantity': 3}, format='json')
+        self.assertEqual(client.get(f'/orders/my/orders/{self.order.pk}/').status_code, 200)
+        other = self.client_for(create_user('bob', is_staff=True))
+        self.assertEqual(other.get('/orders/orders/').json()['results'], [])
+
+
+# Runs pizza/settings.py against the given environment only, ignoring the
+# process environment and any .env file
+def load_settings(**env):
+    environ = {'SECRET_KEY': 'x', 'DEBUG': 'False', **env}
+    with tempfile.TemporaryDirectory() as empty, mock.patch.dict(os.environ, environ, clear=True), \
+            mock.patch('decouple.config', AutoConfig(search_path=empty)):
+        return runpy.run_path(os.path.join(settings.BASE_DIR, 'pizza', 'settings.py'))
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+
+    def test_defaults(self):
+        loaded = load_settings()
+        database = loaded['DATABASES']['default']
+        self.assertEqual(list(loaded['DATABASES']), ['default'])
+        self.assertEqual(database['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(database['NAME'], str(loaded['BASE_DIR'] / 'db.sqlite3'))
+        self.assertEqual((database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']), (60, True))
+        self.assertEqual(database['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        for pragma in ('journal_mode=WAL', 'synchronous=NORMAL', 'busy_timeout=5000', 'mmap_size=134217728', 'temp_store=MEMORY'):
+            self.assertIn(f'PRAGMA {pragma};', database['OPTIONS']['init_command'])
+
+    def test_sqlite_overrides(self):
+        database = load_settings(
+            DB_NAME='/tmp/pizza.sqlite3', DB_CONN_MAX_AGE='0', DB_SQLITE_BUSY_TIMEOUT='100', DB_SQLITE_MMAP_SIZE='0',
+        )['DATABASES']['default']
+        self.assertEqual((database['NAME'], database['CONN_MAX_AGE']), ('/tmp/pizza.sqlite3', 0))
+        self.assertIn('PRAGMA busy_timeout=100;', database['OPTIONS']['init_command'])
+        self.assertIn('PRAGMA mmap_size=0;', database['OPTIONS']['init_command'])
+
+    def test_server_backend(self):
+        database = load_settings(
+            DB_ENGINE='postgresql', DB_NAME='pizza', DB_USER='pizza', DB_PASSWORD='secret', DB_HOST='db', DB_PORT='5433',
+        )['DATABASES']['default']
+        self.assertEqual(database['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(
+            [database[key] for key in ('NAME', 'USER', 'PASSWORD', 'HOST', 'PORT', 'CONN_MAX_AGE')],
+            ['pizza', 'pizza', 'secret', 'db', '5433', 60],
+        )
+        self.assertEqual(database['OPTIONS'], {})
+
+    def test_server_backend_defaults(self):
+        database = load_settings(DB_ENGINE='mysql', DB_NAME='pizza')['DATABASES']['default']
+        self.assertEqual(database['ENGINE'], 'django.db.backends.mysql')
+        self.assertEqual([database[key] for key in ('USER', 'PASSWORD', 'HOST', 'PORT')], ['', '', 'localhost', ''])
+
+    def test_server_backend_needs_a_name(self):
+        with self.assertRaises(UndefinedValueError):
+            load_settings(DB_ENGINE='postgresql')
+
+    def test_postgresql_pool(self):
+        database = load_settings(DB_ENGINE='postgresql', DB_NAME='pizza', DB_POOL='True', DB_POOL_MAX_SIZE='20')['DATABASES']['default']
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20, 'timeout': 10})
+
+    def test_replica(self):
+        databases = load_settings(DB_REPLICA_NAME='/tmp/replica.sqlite3')['DATABASES']
+        self.assertEqual(databases['replica']['NAME'], '/tmp/replica.sqlite3')
+        self.assertEqual(databases['replica']['TEST'], {'MIRROR': 'default'})
+        self.assertEqual(databases['replica']['OPTIONS'], databases['default']['OPTIONS'])
+
+    def test_server_replica_host(self):
+        env = {'DB_ENGINE': 'postgresql', 'DB_NAME': 'pizza', 'DB_HOST': 'db', 'DB_PORT': '5433', 'DB_REPLICA_NAME': 'pizza'}
+        replica = load_settings(**env)['DATABASES']['replica']
+        self.assertEqual((replica['HOST'], replica['PORT']), ('db', '5433'))
+        replica = load_settings(**env, DB_REPLICA_HOST='replica', DB_REPLICA_PORT='5434')['DATABASES']['replica']
+        self.assertEqual((replica['HOST'], replica['PORT']), ('replica', '5434'))
+
+
+class SchemaTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(API_SCHEMA_DIR=directory.name, API_SCHEMA_AUTOGENERATE=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        schema._loaded.clear()
+
+    def test_docs_settings_keep_the_security_definitions(self):
+        from drf_yasg.app_settings import swagger_settings
+        self.assertEqual(swagger_settings.SPEC_URL, '/swagger.json')
+        self.assertIn('Bearer', swagger_settings.SECURITY_DEFINITIONS)
+
+    def test_schema_is_generated_once_and_revalidated(self):
+        response = self.client.get('/swagger.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/orders/orders/', response.json()['paths'])
+        self.assertIn('Bearer', response.json()['securityDefinitions'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(API_SCHEMA_AUTOGENERATE=False)
+    def test_missing_schema_without_autogenerate(self):
+        self.assertEqual(self.client.get('/swagger.yaml').status_code, 404)
+
+
+class ListConditionalTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.orders = self.create_orders(3)
+
+    def test_deleting_an_order_changes_the_list_etag(self):
+        response = self.admin_client.get('/orders/orders/')
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertEqual(self.admin_client.get('/orders/orders/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.admin_client.delete(f'/orders/orders/{self.orders[0].pk}/')
+        response = self.admin_client.get('/orders/orders/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(self.admin_client.get('/orders/orders/', HTTP_IF_MODIFIED_SINCE=http_date()).status_code, 200)
+
+    def test_page_list_reuses_the_aggregate_count(self):
+        # The aggregate and the page, no separate COUNT
+        with self.assertNumQueries(2):
+            response = self.admin_client.get('/orders/orders/?size=small')
+        self.assertEqual(response.json()['count'], 3)
+
+    def test_unfiltered_list_skips_the_aggregate(self):
+        # Latest update and stats counters, then the page
+        with CaptureQueriesContext(connection) as queries:
+            response = self.admin_client.get('/orders/orders/')
+        self.assertEqual(len(queries), 3)
+        self.assertNotIn('COUNT(', ' '.join(query['sql'] for query in queries))
+        self.assertEqual(response.json()['count'], 3)
+
+    def test_customer_changes_change_the_list_etag(self):
+        etag = self.client.get('/orders/my/orders/')['ETag']
+        self.customer.email = 'alice@example.org'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer.save()
+        response = self.client.get('/orders/my/orders/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['customer']['email'], 'alice@example.org')
+
+    def test_cursor_list_skips_the_aggregate(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/orders/my/orders/?cursor=&page_size=2')
+        self.assertEqual(len(response.json()['results']), 2)
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/orders/my/orders/?cursor=&page_size=2', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Order.objects.filter(pk=self.orders[0].pk).delete()
+        self.assertEqual(self.client.get('/orders/my/orders/?cursor=&page_size=2', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ConditionalWriteTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.order, = self.create_orders(1)
+        self.url = f'/orders/orders/{self.order.pk}/update/'
+        self.data = {'size': 'Large', 'order_status': 'Pending', 'quantity': 3}
+
+    def write_during_validation(self, attrs):
+        # Another request saves the order after the If-Match check
+        Order.objects.filter(pk=self.order.pk).update(quantity=5, updated_at=timezone.now())
+        return attrs
+
+    def test_matching_etag_is_written(self):
+        etag = self.admin_client.get(f'/orders/orders/{self.order.pk}/')['ETag']
+        response = self.admin_client.put(self.url, self.data, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_write_after_the_check_is_not_overwritten(self):
+        etag = self.admin_client.get(f'/orders/orders/{self.order.pk}/')['ETag']
+        with mock.patch.object(OrderUpdateSerializer, 'validate', side_effect=self.write_during_validation):
+            response = self.admin_client.put(self.url, self.data, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.quantity, 5)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_status_write_without_precondition_conflicts(self):
+        url = f'/orders/orders/{self.order.pk}/status/'
+        with mock.patch.object(OrderStatusUpdateSerializer, 'validate', side_effect=self.write_during_validation):
+            response = self.admin_client.put(url, {'order_status': 'In Transit'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.order_status, Order.StatusChoices.PENDING)
+
+
+class BulkStatusTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.orders = self.create_orders(3)
+
+    def test_ids_move_matching_orders_and_skip_the_rest(self):
+        Order.objects.filter(pk=self.orders[2].pk).update(order_status=Order.StatusChoices.DELIVERED)
+        response = self.admin_client.post('/orders/orders/status/bulk/', {
+            'ids': [self.orders[0].pk, self.orders[2].pk, 9999], 'order_status': 'In Transit',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], [self.orders[0].pk])
+        self.assertEqual({entry['id'] for entry in response.json()['skipped']}, {self.orders[2].pk, 9999})
+        self.assertEqual(Order.objects.get(pk=self.orders[0].pk).order_status, Order.StatusChoices.IN_TRANSIT)
+
+    def test_filter_moves_matching_orders(self):
+        response = self.admin_client.post('/orders/orders/status/bulk/', {
+            'filter': {'status': 'pending'}, 'order_status': 'In Transit',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['updated']), 3)
+
+    def test_empty_filter_is_refused(self):
+        response = self.admin_client.post('/orders/orders/status/bulk/', {'filter': {}, 'order_status': 'In Transit'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exclude(order_status=Order.StatusChoices.PENDING).exists())
+
+    @override_settings(ORDER_BULK_MAX_SIZE=2)
+    def test_filter_matching_more_than_a_batch_is_refused(self):
+        response = self.admin_client.post('/orders/orders/status/bulk/', {
+            'filter': {'status': 'pending'}, 'order_status': 'In Transit',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exclude(order_status=Order.StatusChoices.PENDING).exists())
+
+    def test_customers_cannot_bulk_update(self):
+        response = self.client.post('/orders/orders/status/bulk/', {'ids': [self.orders[0].pk], 'order_status': 'In Transit'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+# Query counts must not grow with the page size (no per-order customer lookups)
+class QueryCountTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        other = create_user('bob')
+        self.orders = self.create_orders(30) + self.create_orders(10, customer=other)
+
+    def test_order_list(self):
+        # Latest update, stats counters and the page
+        for page_size in (5, 50):
+            with self.subTest(page_size=page_size), self.assertNumQueries(3):
+                response = self.admin_client.get(f'/orders/orders/?page_size={page_size}')
+            self.assertEqual(len(response.json()['results']), min(page_size, 40))
+
+    def test_order_list_cursor(self):
+        for page_size in (5, 50):
+            with self.subTest(page_size=page_size), self.assertNumQueries(1):
+                response = self.admin_client.get(f'/orders/orders/?cursor=&page_size={page_size}')
+            self.assertEqual(len(response.json()['results']), min(page_size, 40))
+
+    def test_my_orders(self):
+        for page_size in (5, 50):
+            with self.subTest(page_size=page_size), self.assertNumQueries(2):
+                response = self.client.get(f'/orders/my/orders/?page_size={page_size}')
+            self.assertEqual(len(response.json()['results']), min(page_size, 30))
+
+    def test_user_orders_for_admin(self):
+        # One more query to check the user exists
+        for page_size in (5, 50):
+            with self.subTest(page_size=page_size), self.assertNumQueries(3):
+                response = self.admin_client.get(f'/orders/user/{self.customer.pk}/orders/?page_size={page_size}')
+            self.assertEqual(len(response.json()['results']), min(page_size, 30))
+
+    def test_order_detail(self):
+        order = self.orders[0]
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(f'/orders/my/orders/{order.pk}/').status_code, 200)
+        # Served from the detail cache
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(f'/orders/my/orders/{order.pk}/').status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.admin_client.get(f'/orders/orders/{order.pk}/').status_code, 200)
+
+
+
+class DetailCacheTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.order, = self.create_orders(1)
+        self.key = order_cache.DETAIL_KEY.format(self.order.pk)
+        self.url = f'/orders/my/orders/{self.order.pk}/'
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertIsNotNone(cache.get(self.key))
+
+    def test_save_invalidates(self):
+        self.order.quantity = 4
+        self.order.save()
+        self.assertIsNone(cache.get(self.key))
+        self.assertEqual(self.client.get(self.url).json()['quantity'], 4)
+
+    def test_delete_invalidates(self):
+        self.order.delete()
+        self.assertIsNone(cache.get(self.key))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_status_change_invalidates(self):
+        response = self.admin_client.put(f'/orders/orders/{self.order.pk}/status/', {'order_status': 'In Transit'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(cache.get(self.key))
+        self.assertEqual(self.client.get(self.url).json()['order_status'], 'In Transit')
+
+    def test_counts_stay_in_process(self):
+        before = order_cache.get_stats()
+        with mock.patch.object(cache, 'incr') as incr, mock.patch.object(cache, 'add') as add:
+            self.client.get(self.url)
+        incr.assert_not_called()
+        add.assert_not_called()
+        self.assertEqual(order_cache.get_stats()['hits'], before['hits'] + 1)
+
+
+# Values the order payloads don't cover, each must render identically
+JSON_EDGE_CASES = {
+    "unicode": {"name": "Pizzería Ünïcode ✓", "separators": "line\u2028paragraph\u2029end"},
+    "datetimes": {
+        "aware": datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+        "naive": datetime.datetime(2024, 5, 1, 12, 30),
+        "date": datetime.date(2024, 5, 1),
+    },
+    "numbers": {"decimal": Decimal("12.50"), "big": 2 ** 70, "negative": -1, "float": 0.1},
+    "nesting": [{"customer": {"id": 1, "username": "a"}}, [], {}, None, True],
+}
+
+
+# FastJSONRenderer/FastJSONParser must be drop-in replacements for DRF's classes
+@skipUnless(orjson, "orjson is not installed")
+@override_settings(FAST_JSON=True)
+class FastJSONCompatibilityTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_orders(3)
+
+    def assertCompatible(self, data):
+        expected = JSONRenderer().render(data)
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(expected)), JSONParser().parse(io.BytesIO(expected)))
+
+    def test_order_payloads(self):
+        orders = OrderDetailSerializer(Order.objects.for_listing(), many=True).data
+        self.assertCompatible({"count": 3, "next": None, "previous": None, "results": orders})
+        self.assertCompatible(orders[0])
+        self.assertCompatible(compact_order_list(Order.objects.compact()))
+
+    def test_edge_cases(self):
+        for name, data in JSON_EDGE_CASES.items():
+            with self.subTest(name):
+                self.assertCompatible(data)
+
+    def test_non_finite_floats_render_as_null(self):
+        for value in (float("nan"), float("inf"), -float("inf")):
+            with self.subTest(value=value):
+                self.assertEqual(FastJSONRenderer().render({"value": value}), b'{"value":null}')
+
+    def test_invalid_body_is_reported_like_drf(self):
+        with self.assertRaises(ParseError) as expected:
+            JSONParser().parse(io.BytesIO(b'{"size": '))
+        with self.assertRaises(ParseError) as fast:
+            FastJSONParser().parse(io.BytesIO(b'{"size": '))
+        self.assertEqual(str(fast.exception.detail), str(expected.exception.detail))
+
+
+# compact_order_list must hold exactly what OrderDetailSerializer(many=True).data
+# holds for the same rows. Order has no decimal fields; rendering both through
+# the JSON renderer catches any type difference (Decimal vs str, datetime vs str)
+class CompactOrderListTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        other = create_user('zoe')
+        User.objects.filter(pk=other.pk).update(username='Zoë')
+        self.other = other
+        created_at = datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+        for size in Order.SizeChoices:
+            for order_status in Order.StatusChoices:
+                self.create_orders(1, size=size, order_status=order_status)
+                self.create_orders(1, customer=other, size=size, order_status=order_status)
+        # Whole seconds and a value no longer among the choices
+        Order.objects.filter(pk=Order.objects.earliest('pk').pk).update(created_at=created_at, updated_at=created_at.replace(microsecond=0), size='FAMILY')
+
+    def assertSameAsSerializer(self, queryset):
+        expected = OrderDetailSerializer(queryset.for_listing(), many=True).data
+        compact = compact_order_list(queryset.compact())
+        self.assertEqual(compact, expected)
+        self.assertEqual(JSONRenderer().render(compact), JSONRenderer().render(expected))
+
+    def test_matches_serializer(self):
+        self.assertSameAsSerializer(Order.objects.order_by('id'))
+        first = compact_order_list(Order.objects.order_by('id').compact()[:1])[0]
+        self.assertEqual((first['size'], first['created_at'], first['updated_at']), ('FAMILY', '2024-05-01T12:30:15.123456Z', '2024-05-01T12:30:15Z'))
+
+    @override_settings(TIME_ZONE='America/New_York')
+    def test_matches_serializer_outside_utc(self):
+        self.assertSameAsSerializer(Order.objects.order_by('-id'))
+
+    def test_nested_customer(self):
+        order = compact_order_list(Order.objects.filter(customer=self.other).compact())[0]
+        self.assertEqual(order['customer'], {'id': self.other.pk, 'username': 'Zoë', 'email': 'zoe@example.com'})
+
+
+class BulkCreateTests(OrderAPITestCase):
+
+    def test_creates_every_valid_order_in_one_batch(self):
+        response = self.client.post('/orders/orders/bulk/', [
+            {'size': 'Large', 'quantity': 2}, {'size': 'Small', 'quantity': 1},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(
+            sorted(Order.objects.filter(customer=self.customer).values_list('size', 'quantity')),
+            [('LARGE', 2), ('SMALL', 1)],
+        )
+        self.assertEqual(response.json()['results'][0]['order']['customer']['id'], self.customer.pk)
+
+    def test_invalid_items_fail_on_their_own(self):
+        response = self.client.post('/orders/orders/bulk/', [
+            {'size': 'Large', 'quantity': 2}, {'size': 'Huge', 'quantity': 0},
+        ], format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.json()['created'], response.json()['failed']), (1, 1))
+        self.assertEqual(response.json()['results'][1]['index'], 1)
+        self.assertIn('errors', response.json()['results'][1])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_all_invalid_is_a_bad_request(self):
+        response = self.client.post('/orders/orders/bulk/', [{'size': 'Huge', 'quantity': 1}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(ORDER_BULK_MAX_SIZE=2)
+    def test_batch_size_and_shape_are_checked(self):
+        self.assertEqual(self.client.post('/orders/orders/bulk/', [{'size': 'Large', 'quantity': 1}] * 3, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/orders/orders/bulk/', [], format='json').status_code, 400)
+        self.assertEqual(self.client.post('/orders/orders/bulk/', {'size': 'Large', 'quantity': 1}, format='json').status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(ORDER_THROTTLES_ENABLED=True)
+    def test_batch_larger_than_the_hourly_rate_uses_up_the_window(self):
+        with mock.patch.object(OrderBulkCreateThrottle, 'THROTTLE_RATES', {'order_bulk_create': '5/hour'}):
+            response = self.client.post('/orders/orders/bulk/', [{'size': 'Large', 'quantity': 1}] * 8, format='json')
+            self.assertEqual(response.status_code, 201)
+            response = self.client.post('/orders/orders/bulk/', [{'size': 'Large', 'quantity': 1}], format='json')
+            self.assertEqual(response.status_code, 429)
+        self.assertEqual(Order.objects.count(), 8)
+
+    def test_created_orders_are_searchable(self):
+        self.client.post('/orders/orders/bulk/', [{'size': 'Large', 'quantity': 2}], format='json')
+        response = self.admin_client.get('/orders/orders/?search=alice')
+        self.assertEqual(response.json()['count'], 1)
+
+
+class ExportTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_orders(2, size='LARGE')
+        self.create_orders(1, order_status='DELIVERED')
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response = self.admin_client.get('/orders/orders/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['customer_username'], 'alice')
+        self.assertEqual(sorted(row['size'] for row in rows), ['Large', 'Large', 'Small'])
+
+    def test_csv_with_filters(self):
+        response = self.admin_client.get('/orders/orders/export/?type=csv&status=pending')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(self.read(response))))
+        self.assertEqual(rows[0][:3], ['id', 'customer_id', 'customer_username'])
+        self.assertEqual(len(rows), 3)
+
+    def test_timestamps_match_the_api(self):
+        order = self.admin_client.get('/orders/orders/').json()['results'][-1]
+        rows = [json.loads(line) for line in self.read(self.admin_client.get('/orders/orders/export/')).splitlines()]
+        row = next(row for row in rows if row['id'] == order['id'])
+        self.assertEqual((row['created_at'], row['updated_at']), (order['created_at'], order['updated_at']))
+        self.assertTrue(row['created_at'].endswith('Z'))
+
+    async def test_asgi_export_streams_from_an_async_iterator(self):
+        token = ClaimsTokenObtainPairSerializer.get_token(self.admin).access_token
+        response = await AsyncClient().get('/orders/orders/export/?type=csv', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(len(list(csv.reader(io.StringIO(content)))), 4)
+
+    def test_unknown_type_and_customers_are_refused(self):
+        self.assertEqual(self.admin_client.get('/orders/orders/export/?type=xml').status_code, 400)
+        self.assertEqual(self.client.get('/orders/orders/export/').status_code, 403)
+
+
+class StatsTests(OrderAPITestCase):
+
+    def test_counters_follow_every_write_path(self):
+        order = Order.objects.create(customer=self.customer, quantity=2)
+        self.client.post('/orders/orders/bulk/', [{'size': 'Large', 'quantity': 3}] * 2, format='json')
+        self.admin_client.put(f'/orders/orders/{order.pk}/status/', {'order_status': 'In Transit'}, format='json')
+        self.admin_client.post('/orders/orders/status/bulk/', {'filter': {'size': 'large'}, 'order_status': 'In Transit'}, format='json')
+        self.admin_client.delete(f'/orders/orders/{Order.objects.filter(size="LARGE").first().pk}/')
+        self.assertEqual(Order.objects.filter(order_status=Order.StatusChoices.IN_TRANSIT).count(), 2)
+        self.assertEqual(stats.diff_counters(stats.live_counters(), stats.stored_counters()), {})
+
+    def test_endpoint_summarizes_the_counters(self):
+        self.client.post('/orders/orders/bulk/', [{'size': 'Large', 'quantity': 3}, {'size': 'Small', 'quantity': 1}], format='json')
+        response = self.admin_client.get('/orders/orders/stats/?bucket=day')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['totals'], {'orders': 2, 'quantity': 4})
+        self.assertEqual(data['by_size']['LARGE'], {'orders': 1, 'quantity': 3})
+        self.assertEqual(len(data['timeline']), 1)
+
+    def test_bad_bucket_and_customers_are_refused(self):
+        self.assertEqual(self.admin_client.get('/orders/orders/stats/?bucket=week').status_code, 400)
+        self.assertEqual(self.client.get('/orders/orders/stats/').status_code, 403)
+
+
+class OrderEventsTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.order, = self.create_orders(1)
+        self.async_client = AsyncClient()
+
+    def auth_headers(self, user):
+        return {'Authorization': f'Bearer {ClaimsTokenObtainPairSerializer.get_token(user).access_token}'}
+
+    async def read_event(self, content):
+        return await asyncio.wait_for(anext(content), timeout=5)
+
+    async def test_owner_gets_the_snapshot_and_status_changes(self):
+        response = await self.async_client.get(f'/orders/my/orders/{self.order.pk}/events/', headers=self.auth_headers(self.customer))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = aiter(response.streaming_content)
+        self.assertIn(b'"order_status": "Pending"', await self.read_event(content))
+
+        await sync_to_async(events.publish_status)(self.order.pk, Order.StatusChoices.DELIVERED, timezone.now())
+        self.assertIn(b'"order_status": "Delivered"', await self.read_event(content))
+        # The stream ends once the order is delivered
+        with self.assertRaises(StopAsyncIteration):
+            await self.read_event(content)
+
+    async def test_other_customers_get_a_404(self):
+        other = await sync_to_async(create_user)('bob')
+        response = await self.async_client.get(f'/orders/my/orders/{self.order.pk}/events/', headers=self.auth_headers(other))
+        self.assertEqual(response.status_code, 404)
+
+    def test_wsgi_requests_are_refused(self):
+        self.assertEqual(self.client.get(f'/orders/my/orders/{self.order.pk}/events/').status_code, 501)
+
+
+# Through pizza.asgi like a real server. The handler runs the view in its own
+# thread context, outside the test case's transaction
+@override_settings(CACHES=LOCMEM_CACHE, ORDER_THROTTLES_ENABLED=False, JWT_REVOCATION_CHECK=False, METRICS_SAMPLE_RATE=0)
+class OrderEventsASGITests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.customer = create_user('alice')
+        self.order = Order.objects.create(customer=self.customer, quantity=1)
+
+    async def test_streams_through_the_asgi_application(self):
+        token = ClaimsTokenObtainPairSerializer.get_token(self.customer).access_token
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': f'/orders/my/orders/{self.order.pk}/events/', 'query_string': b'',
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+        })
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        start = await communicator.receive_output(timeout=5)
+        self.assertEqual((start['type'], start['status']), ('http.response.start', 200))
+        self.assertIn((b'Content-Type', b'text/event-stream'), start['headers'])
+        body = await communicator.receive_output(timeout=5)
+        self.assertIn(b'"order_status": "Pending"', body['body'])
+        self.assertTrue(body['more_body'])
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(timeout=5)
+
+
+# The async read views answer exactly like the sync views on the same URLs
+class AsyncReadViewTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.order, = self.create_orders(1)
+        self.other_order, = self.create_orders(1, customer=create_user('bob'))
+
+    async def get(self, view, path, user=None, **kwargs):
+        headers = {}
+        if user is not None:
+            headers['Authorization'] = f'Bearer {ClaimsTokenObtainPairSerializer.get_token(user).access_token}'
+        return await view.as_view()(AsyncRequestFactory().get(path, headers=headers), **kwargs)
+
+    async def assertSameResponse(self, view, path, user=None, **kwargs):
+        client = APIClient() if user is None else self.client_for(user)
+        expected = await sync_to_async(client.get)(path)
+        response = await self.get(view, path, user, **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), expected.json())
+        self.assertEqual(response.get('ETag'), expected.get('ETag'))
+        return response
+
+    async def test_lists(self):
+        await self.assertSameResponse(async_views.AsyncOrderCreateListView, '/orders/orders/?page_size=1&page=2', self.admin)
+        await self.assertSameResponse(async_views.AsyncOrderCreateListView, '/orders/orders/?status=pending', self.admin)
+        await self.assertSameResponse(async_views.AsyncUserOrdersView, '/orders/my/orders/', self.customer)
+        path = f'/orders/user/{self.customer.pk}/orders/'
+        await self.assertSameResponse(async_views.AsyncUserOrdersView, path, self.admin, user_id=self.customer.pk)
+
+    async def test_details(self):
+        path = f'/orders/orders/{self.order.pk}/'
+        await self.assertSameResponse(async_views.AsyncOrderDetailView, path, self.admin, order_id=self.order.pk)
+        path = f'/orders/my/orders/{self.order.pk}/'
+        await self.assertSameResponse(async_views.AsyncUserOrderDetail, path, self.customer, order_id=self.order.pk)
+
+    async def test_authentication_and_permissions(self):
+        path = '/orders/my/orders/'
+        self.assertEqual((await self.assertSameResponse(async_views.AsyncUserOrdersView, path)).status_code, 401)
+        path = f'/orders/orders/{self.order.pk}/'
+        response = await self.assertSameResponse(async_views.AsyncOrderDetailView, path, self.customer, order_id=self.order.pk)
+        self.assertEqual(response.status_code, 403)
+
+    async def test_missing_and_foreign_orders_are_not_found(self):
+        path = f'/orders/my/orders/{self.other_order.pk}/'
+        response = await self.assertSameResponse(async_views.AsyncUserOrderDetail, path, self.customer, order_id=self.other_order.pk)
+        self.assertEqual(response.status_code, 404)
+        response = await self.get(async_views.AsyncOrderDetailView, '/orders/orders/0/', self.admin, order_id=0)
+        self.assertEqual(response.status_code, 404)
+        response = await self.get(async_views.AsyncUserOrdersView, '/orders/user/999999/orders/', self.admin, user_id=999999)
+        self.assertEqual(response.status_code, 404)
+
+
+class IdempotencyTests(OrderAPITestCase):
+
+    def post(self, client, key, data=None):
+        return client.post('/orders/orders/', data or {'size': 'Large', 'quantity': 2}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.post(self.client, 'key-1')
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(1):
+            retry = self.post(self.client, 'key-1')
+        self.assertEqual((retry.status_code, retry.content), (201, first.content))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_keys_are_scoped_to_the_user(self):
+        self.post(self.client, 'key-1')
+        self.assertEqual(self.post(self.client_for(create_user('bob')), 'key-1').status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_reusing_a_key_with_another_body_is_refused(self):
+        self.post(self.client, 'key-1')
+        self.assertEqual(self.post(self.client, 'key-1', {'size': 'Small', 'quantity': 1}).status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_LOCK_WAIT=0)
+    def test_duplicate_of_a_request_in_flight_is_refused(self):
+        request = APIRequestFactory().post('/orders/orders/', {'size': 'Large', 'quantity': 2}, format='json')
+        request.user = self.customer
+        in_flight = IdempotentRequest(request, 'key-1')
+        in_flight.acquire()
+        self.assertEqual(self.post(self.client, 'key-1').status_code, 409)
+        in_flight.release()
+        self.assertEqual(self.post(self.client, 'key-1').status_code, 201)
+
+    def test_invalid_key_is_refused(self):
+        self.assertEqual(self.post(self.client, 'k' * 256).status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_precondition_failures_are_not_stored(self):
+        order, = self.create_orders(1)
+        data = {'size': 'Large', 'order_status': 'Pending', 'quantity': 3}
+        url = f'/orders/orders/{order.pk}/update/'
+        response = self.client.put(url, data, format='json', HTTP_IDEMPOTENCY_KEY='key-1', HTTP_IF_MATCH='"stale"')
+        self.assertEqual(response.status_code, 412)
+        response = self.client.put(url, data, format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    @override_settings(IDEMPOTENCY_LOCK_WAIT=0, IDEMPOTENCY_LOCK_TIMEOUT=0)
+    def test_abandoned_key_is_taken_over(self):
+        request = APIRequestFactory().post('/orders/orders/', {'size': 'Large', 'quantity': 2}, format='json')
+        request.user = self.customer
+        IdempotentRequest(request, 'key-1').acquire()
+        self.assertEqual(self.post(self.client, 'key-1').status_code, 201)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 201)
+
+    def test_responses_survive_many_keys(self):
+        first = self.post(self.client, 'key-0')
+        for index in range(1, 320):
+            IdempotencyKey.objects.create(
+                user=self.customer, scope=f'{index:064d}', fingerprint='', token='', created_at=timezone.now(),
+            )
+        retry = self.post(self.client, 'key-0')
+        self.assertEqual((retry.status_code, retry.content), (201, first.content))
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class SearchTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.orders = self.create_orders(2, size='LARGE')
+        search.index_orders(self.orders, customer=self.customer)
+
+    def search(self, term):
+        return self.admin_client.get('/orders/orders/', {'search': term}).json()['count']
+
+    def test_matches_customers_and_ids_only(self):
+        self.assertEqual(self.search('ali'), 2)
+        self.assertEqual(self.search('alice@example'), 2)
+        self.assertEqual(self.search(str(self.orders[0].pk)), 1)
+        self.assertEqual(self.search('large'), 0)
+        self.assertEqual(self.search('pending'), 0)
+
+    def test_renaming_the_customer_reindexes_their_orders(self):
+        self.customer.username = 'carol'
+        self.customer.save()
+        self.assertEqual(self.search('carol'), 2)
+
+    def test_other_user_saves_skip_the_reindex(self):
+        self.customer.set_password('new-pass')
+        with self.assertNumQueries(1):
+            self.customer.save(update_fields=['password'])
+        # A full save without changes only reads the previous username and email
+        with self.assertNumQueries(2):
+            self.customer.save()
+
+
+@override_settings(CACHES=LOCMEM_CACHE, ORDER_THROTTLES_ENABLED=True)
+class SlidingWindowThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.request = APIRequestFactory().get('/')
+        self.request.user = create_user('alice')
+
+    def throttle(self):
+        with mock.patch.object(SlidingWindowUserRateThrottle, 'THROTTLE_RATES', {'user': '3/min'}):
+            return SlidingWindowUserRateThrottle()
+
+    def test_counts_weighted_requests_in_the_window(self):
+        with mock.patch.object(SlidingWindowUserRateThrottle, 'timer', return_value=60.0):
+            self.assertTrue(self.throttle().allow_request(self.request, view=None))
+            batch_view = mock.Mock(get_throttle_cost=lambda request: 2)
+            self.assertTrue(self.throttle().allow_request(self.request, batch_view))
+            throttle = self.throttle()
+            self.assertFalse(throttle.allow_request(self.request, view=None))
+            self.assertEqual(throttle.wait(), 60)
+
+    def test_previous_window_weighs_by_its_overlap(self):
+        with mock.patch.object(SlidingWindowUserRateThrottle, 'timer', return_value=60.0):
+            for _ in range(3):
+                self.throttle().allow_request(self.request, view=None)
+        # Half way through the next window the previous one counts for 1.5 requests
+        with mock.patch.object(SlidingWindowUserRateThrottle, 'timer', return_value=150.0):
+            self.assertTrue(self.throttle().allow_request(self.request, view=None))
+            self.assertFalse(self.throttle().allow_request(self.request, view=None))
+
+    @override_settings(ORDER_THROTTLE_ENGINE='sliding_window')
+    def test_needs_an_atomic_cache(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'needs a Redis or Memcached cache'):
+            get_throttle_engine()
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'}}
+        with override_settings(CACHES=redis):
+            self.assertIs(get_throttle_engine(), SlidingWindowUserRateThrottle)
+
+
+class OpenOrdersFilterTests(OrderAPITestCase):
+
+    def test_open_status_lists_orders_not_delivered(self):
+        pending, = self.create_orders(1)
+        in_transit, = self.create_orders(1, order_status=Order.StatusChoices.IN_TRANSIT)
+        self.create_orders(1, order_status=Order.StatusChoices.DELIVERED)
+        response = self.admin_client.get('/orders/orders/?status=open')
+        self.assertEqual({order['id'] for order in response.json()['results']}, {pending.pk, in_transit.pk})
+
+
+class BenchmarkSeedTests(TestCase):
+
+    def test_seeded_orders_feed_the_counters_and_search_index(self):
+        customers, created = benchmarks.seed(users=5, orders=50, batch_size=20)
+        self.assertEqual((len(customers), created, Order.objects.count()), (5, 50, 50))
+        self.assertEqual(stats.diff_counters(stats.live_counters(), stats.stored_counters()), {})
+        matches = search.search_orders(Order.objects.all(), customers[0].username, customers=True)
+        self.assertEqual(matches.count(), Order.objects.filter(customer=customers[0]).count())
+
+    @override_settings(CACHES=LOCMEM_CACHE, METRICS_SAMPLE_RATE=0)
+    def test_bench_orders_leaves_no_admin_behind(self):
+        benchmarks.seed(users=2, orders=5)
+        call_command('bench_orders', scenarios=['detail', 'status_update'], iterations=2, warmup=0, stdout=io.StringIO())
+        self.assertFalse(User.objects.filter(is_staff=True).exists())
+        self.assertEqual(Order.objects.count(), 5)
+
+    def test_summarize_latencies(self):
+        summary = benchmarks.summarize_latencies([0.001 * n for n in range(1, 101)], elapsed=2)
+        self.assertEqual((summary['requests'], summary['rps']), (100, 50.0))
+        self.assertEqual((summary['p50_ms'], summary['p99_ms']), (51.0, 99.0))
+
+
+
+@override_settings(METRICS_SAMPLE_RATE=0)
+class ExplainOrderQueriesTests(TestCase):
+
+    def setUp(self):
+        self.customers, _ = benchmarks.seed(users=3, orders=60)
+
+    def explain(self, **options):
+        out = io.StringIO()
+        call_command('explain_order_queries', customer=self.customers[0].pk, search=self.customers[0].username, stdout=out, **options)
+        return out.getvalue()
+
+    def test_every_endpoint_is_indexed(self):
+        output = self.explain()
+        for name in ('orders list (3 queries)', 'orders list ?search', 'orders list ?cursor', 'my order detail'):
+            self.assertIn(name, output)
+        self.assertNotIn('FULL SCAN', output)
+
+    @skipUnless(connection.vendor == 'sqlite', 'recreates the index in SQLite syntax')
+    def test_cursor_tiebreak_without_an_index_sorts(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX order_created_idx')
+            cursor.execute('CREATE INDEX order_created_idx ON orders_order (created_at DESC)')
+        with self.assertRaisesMessage(CommandError, 'orders list ?cursor (sort)'):
+            self.explain()
+
+
+class MetricsTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_orders(2)
+
+    @override_settings(METRICS_SAMPLE_RATE=1, METRICS_SERVER_TIMING=True)
+    def test_sampled_requests_are_timed_and_exported(self):
+        with self.assertLogs('pizza.metrics', 'INFO') as logs:
+            response = self.client.get('/orders/my/orders/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+        self.assertEqual(json.loads(logs.records[0].getMessage())['endpoint'], 'my_orders_list')
+
+        with self.assertLogs('pizza.metrics', 'INFO'):
+            body = self.admin_client.get('/metrics/').content.decode()
+        self.assertIn('http_request_duration_seconds_count{method="GET",endpoint="my_orders_list"}', body)
+
+    def test_serializers_are_timed_once_per_call(self):
+        self.create_orders(3)
+        with mock.patch('orders.serializers.timing', wraps=timing) as timed:
+            data = OrderDetailSerializer(Order.objects.for_listing(), many=True).data
+        self.assertEqual(len(data), 5)
+        timed.assert_called_once_with('serializer')
+
+        serializer = OrderStatusUpdateSerializer(data={'order_status': 'Delivered'})
+        with mock.patch('orders.serializers.timing', wraps=timing) as timed:
+            self.assertTrue(serializer.is_valid())
+        timed.assert_called_once_with('serializer')
+
+    def test_unsampled_requests_are_left_alone(self):
+        response = self.client.get('/orders/my/orders/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_metrics_are_admin_only(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
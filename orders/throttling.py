@@ -1,25 +1,150 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework.throttling import UserRateThrottle
+from pizza.metrics import timing
+
+
+# Views can weigh a request, e.g. a batch of N orders costs N. A request never
+# costs more than the whole rate, a larger batch uses up the window instead of
+# being refused forever
+def get_request_cost(request, view, num_requests):
+    get_cost = getattr(view, "get_throttle_cost", None)
+    return min(get_cost(request), num_requests) if get_cost else 1
+
+
+# Reports the time spent deciding to the request metrics
+class TimedThrottleMixin:
+
+    def allow_request(self, request, view):
+        with timing("throttle"):
+            return super().allow_request(request, view)
+
+
+# DRF's timestamp-list throttle, with weighted requests
+class HistoryUserRateThrottle(TimedThrottleMixin, UserRateThrottle):
+
+    def allow_request(self, request, view):
+        if not settings.ORDER_THROTTLES_ENABLED:
+            return True
+        self.cost = get_request_cost(request, view, self.num_requests)
+        return super().allow_request(request, view)
+
+    def throttle_success(self):
+        if len(self.history) + self.cost > self.num_requests:
+            return self.throttle_failure()
+        self.history[:0] = [self.now] * self.cost
+        self.cache.set(self.key, self.history, self.duration)
+        return True
+
+
+# Sliding-window counter throttle.
+# Keeps one integer per (user, window) instead of a list of timestamps, and
+# estimates the rate as current + previous window weighted by their overlap.
+# A check is one get_many(); an admitted request adds add() + incr(), so the
+# cost stays constant however many requests the window holds.
+# The check and the increment are separate calls: concurrent requests of one
+# user can each pass the check, overshooting the limit by at most that many.
+# The counters are only exact with a backend whose incr() is atomic across
+# workers (Redis, Memcached); FileBasedCache and DatabaseCache implement it
+# as get + set and can lose increments, LocMemCache isn't shared at all.
+class SlidingWindowUserRateThrottle(TimedThrottleMixin, UserRateThrottle):
+
+    def allow_request(self, request, view):
+        if self.rate is None or not settings.ORDER_THROTTLES_ENABLED:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.cost = get_request_cost(request, view, self.num_requests)
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        current_key = f"{self.key}:{window}"
+        previous_key = f"{self.key}:{window - 1}"
+
+        counts = self.cache.get_many([current_key, previous_key])
+        self.current = counts.get(current_key, 0)
+        self.previous = counts.get(previous_key, 0)
+        self.overlap = 1 - (self.now % self.duration) / self.duration
+
+        if self.previous * self.overlap + self.current + self.cost > self.num_requests:
+            return self.throttle_failure()
+
+        # add() only sets a missing key; incr() is atomic on Redis/Memcached only
+        self.cache.add(current_key, 0, self.duration * 2)
+        try:
+            self.cache.incr(current_key, self.cost)
+        except ValueError:
+            self.cache.set(current_key, self.cost, self.duration * 2)
+        return self.throttle_success()
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        # Time until the previous window's weight drops enough to admit a request
+        if self.previous == 0 or self.current + self.cost > self.num_requests:
+            return self.duration - (self.now % self.duration)
+        target = (self.num_requests - self.current - self.cost) / self.previous
+        return max(0, (self.overlap - target) * self.duration)
+
+
+THROTTLE_ENGINES = {
+    "history": HistoryUserRateThrottle,
+    "sliding_window": SlidingWindowUserRateThrottle,
+}
+
+# Cache backends whose incr() is atomic across workers
+ATOMIC_INCR_BACKENDS = {
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django_redis.cache.RedisCache",
+}
+
+
+# Resolved when the orders app loads, so a sliding window on a cache that would
+# lose increments stops the server from starting
+def get_throttle_engine():
+    engine = getattr(settings, "ORDER_THROTTLE_ENGINE", "history")
+    if engine not in THROTTLE_ENGINES:
+        raise ImproperlyConfigured(f"ORDER_THROTTLE_ENGINE must be one of {', '.join(THROTTLE_ENGINES)}, not {engine!r}")
+    backend = settings.CACHES["default"]["BACKEND"]
+    if engine == "sliding_window" and backend not in ATOMIC_INCR_BACKENDS:
+        raise ImproperlyConfigured(
+            f"ORDER_THROTTLE_ENGINE=sliding_window needs a Redis or Memcached cache, {backend} can lose increments"
+        )
+    return THROTTLE_ENGINES[engine]
+
+
+OrderRateThrottle = get_throttle_engine()
 
 
 # Limit how often a user can create orders
-class OrderCreateThrottle(UserRateThrottle):
+class OrderCreateThrottle(OrderRateThrottle):
     scope = "order_create"
 
 
+# Limit how many orders a user can create in batches, counted per order
+class OrderBulkCreateThrottle(OrderRateThrottle):
+    scope = "order_bulk_create"
+
+
 # Limit how often a user can read their own orders
-class UserOrderThrottle(UserRateThrottle):
+class UserOrderThrottle(OrderRateThrottle):
     scope = "user_orders"
 
 
 # Limit admin order reads
-class AdminOrderReadThrottle(UserRateThrottle):
+class AdminOrderReadThrottle(OrderRateThrottle):
     scope = "admin_order_read"
 
 
 # Limit admin order updates
-class AdminOrderWriteThrottle(UserRateThrottle):
+class AdminOrderWriteThrottle(OrderRateThrottle):
     scope = "admin_order_write"
 
 # limit admin delete order
-class AdminOrderDeleteThrottle(UserRateThrottle):
-    scope = "admin_delete_order"
\ No newline at end of file
+class AdminOrderDeleteThrottle(OrderRateThrottle):
+    scope = "admin_delete_order"
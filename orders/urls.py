@@ -1,27 +1,58 @@
 from django.urls import path
-from . import views
+from django.conf import settings
+from . import views, async_views
+
+# Read endpoints run as native async views when ORDER_ASYNC_READS is on (serve with ASGI)
+if settings.ORDER_ASYNC_READS:
+    order_list_view = async_views.AsyncOrderCreateListView
+    order_detail_view = async_views.AsyncOrderDetailView
+    user_orders_view = async_views.AsyncUserOrdersView
+    user_order_detail_view = async_views.AsyncUserOrderDetail
+else:
+    order_list_view = views.OrderCreateListView
+    order_detail_view = views.OrderDetailView
+    user_orders_view = views.UserOrdersView
+    user_order_detail_view = views.UserOrderDetail
 
 urlpatterns = [
     # Hello endpoint
     path('',views.HelloOrderView.as_view(), name='hello_orders'),
      
     # Orders: List & Create
-    path('orders/',views.OrderCreateListView.as_view(),name='orders_list_create'),
+    path('orders/',order_list_view.as_view(),name='orders_list_create'),
+
+    # Orders: state of an order accepted in write-behind mode
+    path('orders/queued/<str:tracking_id>/',views.QueuedOrderView.as_view(),name='queued_order'),
+
+    # Orders: bulk create
+    path('orders/bulk/',views.BulkOrderCreateView.as_view(),name='orders_bulk_create'),
+
+    # Orders: streaming export (Admin only)
+    path('orders/export/',views.OrderExportView.as_view(),name='orders_export'),
+
+    # Orders: statistics (Admin only)
+    path('orders/stats/',views.OrderStatsView.as_view(),name='orders_stats'),
 
     # Retrieve / Delete an order (Admin only)
-    path('orders/<int:order_id>/',views.OrderDetailView.as_view(),name='order_retrieve_delete'),
+    path('orders/<int:order_id>/',order_detail_view.as_view(),name='order_retrieve_delete'),
 
     # Update order status (Admin only)
     path('orders/<int:order_id>/status/',views.UpdateOrderStatusView.as_view(),name='order_update_status'),
 
+    # Update status of many orders (Admin only)
+    path('orders/status/bulk/',views.BulkOrderStatusView.as_view(),name='orders_bulk_update_status'),
+
     # Full update order (User & Admin)
     path('orders/<int:order_id>/update/',views.UpdateOrderView.as_view(),name='order_full_update'),
 
     # Logged-in user's orders
-    path('my/orders/',views.UserOrdersView.as_view(),name='my_orders_list'),
-    path('my/orders/<int:order_id>/',views.UserOrderDetail.as_view(),name='my_order_detail'),
+    path('my/orders/',user_orders_view.as_view(),name='my_orders_list'),
+    path('my/orders/<int:order_id>/',user_order_detail_view.as_view(),name='my_order_detail'),
+
+    path('my/orders/<int:order_id>/events/',async_views.AsyncOrderEventsView.as_view(),name='my_order_events'),
 
     # Admin fetching orders of any user
-    path('user/<int:user_id>/orders/',views.UserOrdersView.as_view(),name='user_orders_list'),
-    path('user/<int:user_id>/orders/<int:order_id>/',views.UserOrderDetail.as_view(),name='user_order_detail'),
+    path('user/<int:user_id>/orders/',user_orders_view.as_view(),name='user_orders_list'),
+    path('user/<int:user_id>/orders/<int:order_id>/',user_order_detail_view.as_view(),name='user_order_detail'),
+    path('user/<int:user_id>/orders/<int:order_id>/events/',async_views.AsyncOrderEventsView.as_view(),name='user_order_events'),
 ]
@@ -1,23 +1,133 @@
 from django.shortcuts import render,get_object_or_404
+from django.urls import reverse
 from rest_framework import generics,status
 from rest_framework.response import Response
-from .serializers import OrderCreationSerializer,OrderDetailSerializer,OrderStatusUpdateSerializer,DummySerializer,OrderUpdateSerializer
+from .idempotency import IdempotentViewMixin
+from .serializers import OrderCreationSerializer,OrderDetailSerializer,OrderStatusUpdateSerializer,DummySerializer,OrderUpdateSerializer,OrderBulkStatusSerializer,compact_order_list
 from .models import Order
 from rest_framework.permissions import IsAuthenticated,IsAuthenticatedOrReadOnly,IsAdminUser
 from django.contrib.auth import get_user_model
-from drf_yasg.utils import swagger_auto_schema
-from rest_framework.pagination import PageNumberPagination
+from authentication.tokens import get_cached_user
+from pizza.schema import swagger_auto_schema, header_parameter
+from pizza.metrics import timing
+from rest_framework.pagination import PageNumberPagination,CursorPagination
 from rest_framework.throttling import UserRateThrottle,AnonRateThrottle
-from .throttling import UserOrderThrottle,OrderCreateThrottle,AdminOrderReadThrottle,AdminOrderWriteThrottle,AdminOrderDeleteThrottle
-from django.db.models import Q
+from .throttling import UserOrderThrottle,OrderCreateThrottle,OrderBulkCreateThrottle,AdminOrderReadThrottle,AdminOrderWriteThrottle,AdminOrderDeleteThrottle
+from .search import search_orders
+from .cache import get_order_detail,invalidate_order_detail
+from . import search, stats, events, conditional, write_behind
+from django.http import Http404
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator as DjangoPaginator
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date,parse_datetime
+from django.http import StreamingHttpResponse
+from datetime import datetime
+from .export import export_orders,EXPORT_FORMATS
+from rest_framework.exceptions import ValidationError
 
 User = get_user_model()
 
+# Documents the header handled by IdempotentViewMixin
+IDEMPOTENCY_KEY_PARAMETER = header_parameter(
+    'Idempotency-Key', "Unique key per operation; retries with the same key return the original response",
+)
+
 # Pagination
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 50
+    # Count already fetched by the caller, saves the paginator's COUNT query
+    known_count = None
+
+    def django_paginator_class(self, object_list, per_page):
+        paginator = DjangoPaginator(object_list, per_page)
+        if self.known_count is not None:
+            paginator.count = self.known_count
+        return paginator
+
+
+# Keyset pagination, opt in with ?cursor= (no COUNT, stable while orders come in)
+class OrderCursorPagination(CursorPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    ordering = ('-created_at', '-id')
+
+
+def get_order_paginator(request):
+    if OrderCursorPagination.cursor_query_param in request.query_params:
+        return OrderCursorPagination()
+    return StandardResultsSetPagination()
+
+
+# Paginated order list with conditional GET. Page-number lists check the ETag
+# before the page query; cursor lists have no count to tag, so the page is
+# fetched and tagged from its rows
+def order_list_response(request, orders):
+    paginator = get_order_paginator(request)
+    if isinstance(paginator, OrderCursorPagination):
+        result_page = paginator.paginate_queryset(orders.compact(), request)
+        etag = conditional.page_etag(request, result_page, paginator.get_next_link(), paginator.get_previous_link())
+    else:
+        summary = conditional.list_summary(orders)
+        etag = conditional.list_etag(request, summary)
+        paginator.known_count = summary['total']
+        result_page = None
+
+    not_modified = conditional.check(request, etag, None)
+    if not_modified is not None:
+        return not_modified
+
+    if result_page is None:
+        result_page = paginator.paginate_queryset(orders.compact(), request)
+    return conditional.with_validators(paginator.get_paginated_response(compact_order_list(result_page)), etag, None)
+
+
+# Shared order list pipeline
+def parse_date_filter(value, name):
+    # Accepts an ISO date or datetime, naive values are in the current timezone
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({name: "Enter a valid ISO date or datetime."})
+        parsed = datetime.combine(day, datetime.min.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_orders(params, orders, search_customer=False):
+    status_filter = params.get('status')
+    size_filter = params.get('size')
+    search = params.get('search')
+    created_after = params.get('created_after')
+    created_before = params.get('created_before')
+
+    if status_filter and status_filter.lower() == 'open':
+        # Anything not delivered yet, served by the partial order_open_created_idx
+        orders = orders.exclude(order_status=Order.StatusChoices.DELIVERED)
+    elif status_filter:
+        orders = orders.filter(order_status=status_filter.upper())
+    if size_filter:
+        orders = orders.filter(size=size_filter.upper())
+    if created_after:
+        orders = orders.filter(created_at__gte=parse_date_filter(created_after, 'created_after'))
+    if created_before:
+        orders = orders.filter(created_at__lt=parse_date_filter(created_before, 'created_before'))
+    if search:
+        orders = search_orders(orders, search, customers=search_customer)
+    return orders
+
+
+# Serialized order detail, cached by get_order_detail
+def load_order_detail(order_id):
+    order = get_object_or_404(Order.objects.for_listing(), pk=order_id)
+    return dict(OrderDetailSerializer(order).data)
 
 
 
@@ -33,7 +143,7 @@ class HelloOrderView(generics.GenericAPIView):
 
 # Create & List Orders
 
-class OrderCreateListView(generics.GenericAPIView):
+class OrderCreateListView(IdempotentViewMixin, generics.GenericAPIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
     pagination_class = StandardResultsSetPagination
 
@@ -51,35 +161,154 @@ class OrderCreateListView(generics.GenericAPIView):
 
     @swagger_auto_schema(operation_summary="List all orders made")
     def get(self, request):
-        orders = Order.objects.all()
+        orders = Order.objects.for_listing()
 
         # Filtering
+        orders = filter_orders(request.query_params, orders, search_customer=True)
+
+        # Conditional GET & Pagination
+        return order_list_response(request, orders)
 
-        status_filter = request.query_params.get('status')
-        size_filter = request.query_params.get('size')
-        search = request.query_params.get('search')
-       
-        if status_filter:
-            orders = orders.filter(order_status=status_filter.upper())
-        if size_filter:
-            orders = orders.filter(size=size_filter.upper())
-        if search:
-            orders = orders.filter(Q(customer__username__icontains=search) | Q(id__icontains=search))
-
-        #Pagination
-        paginator = StandardResultsSetPagination()
-        result_page = paginator.paginate_queryset(orders, request)
-        serializer = self.get_serializer_class()(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
-
-    @swagger_auto_schema(operation_summary="Create a new order")
+    @swagger_auto_schema(operation_summary="Create a new order", manual_parameters=[IDEMPOTENCY_KEY_PARAMETER])
     def post(self, request):
         serializer = self.get_serializer_class()(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(customer=request.user)
+
+        # Write-behind: accept now, process_order_queue persists it
+        if settings.ORDER_WRITE_BEHIND:
+            tracking_id = write_behind.enqueue(request.user.id, serializer.validated_data)
+            return Response(
+                {"tracking_id": tracking_id, "state": write_behind.QUEUED},
+                status=status.HTTP_202_ACCEPTED,
+                headers={"Location": reverse('queued_order', args=[tracking_id])},
+            )
+
+        serializer.save(customer_id=request.user.id)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+# State of an order accepted in write-behind mode
+class QueuedOrderView(generics.GenericAPIView):
+    serializer_class = DummySerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_throttles(self):
+        return [UserOrderThrottle()]
+
+    @swagger_auto_schema(operation_summary="Track an order accepted for creation")
+    def get(self, request, tracking_id):
+        entry = write_behind.get_entry(tracking_id)
+        # Only the customer (or an admin) can see the entry
+        if entry is None or (entry["customer_id"] != request.user.id and not request.user.is_staff):
+            raise Http404
+        return Response(
+            {key: entry[key] for key in ("tracking_id", "state", "order_id", "error")},
+            status=status.HTTP_200_OK,
+        )
+
+
+# Create many orders in one request
+class BulkOrderCreateView(IdempotentViewMixin, generics.GenericAPIView):
+    serializer_class = OrderCreationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_throttles(self):
+        return [OrderBulkCreateThrottle()]
+
+    def get_throttle_cost(self, request):
+        # The whole batch counts against the order_bulk_create rate
+        return len(request.data) if isinstance(request.data, list) else 1
+
+    @swagger_auto_schema(operation_summary="Create many orders at once", manual_parameters=[IDEMPOTENCY_KEY_PARAMETER], request_body=OrderCreationSerializer(many=True))
+    def post(self, request):
+        items = request.data
+        max_size = settings.ORDER_BULK_MAX_SIZE
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "Expected a non-empty list of orders."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > max_size:
+            return Response({"detail": f"A batch can hold at most {max_size} orders."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # request.user may be a token-only user, load the row once for the whole batch
+        customer = get_cached_user(request.user.id)
+
+        # Validate every item with one serializer instance, timed as a whole
+        serializer = self.serializer_class()
+        results = [None] * len(items)
+        orders = []
+        with timing("serializer"):
+            for index, item in enumerate(items):
+                try:
+                    validated = serializer.run_validation(item)
+                except ValidationError as exc:
+                    results[index] = {"index": index, "errors": exc.detail}
+                    continue
+                orders.append((index, Order(customer=customer, **validated)))
+
+        if orders:
+            with transaction.atomic():
+                created = Order.objects.bulk_create([order for _, order in orders])
+                # bulk_create skips post_save, index and count the batch directly
+                search.index_orders(created, customer=customer)
+                stats.record_created(created)
+            for (index, _), data in zip(orders, OrderDetailSerializer(created, many=True).data):
+                results[index] = {"index": index, "order": data}
+
+        if not orders:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(orders) < len(items):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response({"created": len(orders), "failed": len(items) - len(orders), "results": results}, status=response_status)
+
+
+# Stream every matching order as NDJSON or CSV (Admin only)
+class OrderExportView(generics.GenericAPIView):
+    serializer_class = DummySerializer
+    permission_classes = [IsAdminUser]
+
+    def get_throttles(self):
+        return [AdminOrderReadThrottle()]
+
+    @swagger_auto_schema(operation_summary="Export orders as NDJSON or CSV")
+    def get(self, request):
+        export_format = request.query_params.get('type', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response({"detail": "type must be one of: " + ", ".join(EXPORT_FORMATS)}, status=status.HTTP_400_BAD_REQUEST)
+
+        orders = filter_orders(request.query_params, Order.objects.all())
+        # Served by the ASGI handler, stream from an async iterator
+        asynchronous = isinstance(request._request, ASGIRequest)
+        content_type, lines = export_orders(orders, export_format, asynchronous=asynchronous)
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="orders.{export_format}"'
+        return response
+
+
+# Order counts and quantities by status, size and time (Admin only)
+class OrderStatsView(generics.GenericAPIView):
+    serializer_class = DummySerializer
+    permission_classes = [IsAdminUser]
+
+    def get_throttles(self):
+        return [AdminOrderReadThrottle()]
+
+    @swagger_auto_schema(operation_summary="Order statistics")
+    def get(self, request):
+        bucket = request.query_params.get('bucket', 'hour')
+        if bucket not in ('hour', 'day'):
+            return Response({"detail": "bucket must be 'hour' or 'day'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        since = request.query_params.get('since')
+        until = request.query_params.get('until')
+        data = stats.summarize(
+            since=parse_date_filter(since, 'since') if since else None,
+            until=parse_date_filter(until, 'until') if until else None,
+            bucket=bucket,
+        )
+        return Response(data, status=status.HTTP_200_OK)
+
+
 # Retrieve / Delete Order by ID (Admin only)
 class OrderDetailView(generics.GenericAPIView):
     serializer_class = OrderDetailSerializer
@@ -94,9 +323,12 @@ class OrderDetailView(generics.GenericAPIView):
 
     @swagger_auto_schema(operation_summary="Retrieve an order by id")
     def get(self, request, order_id):
-        order = get_object_or_404(Order, pk=order_id)
-        serializer = self.serializer_class(order)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data = get_order_detail(order_id, lambda: load_order_detail(order_id))
+        validators = conditional.order_validators(order_id, data["updated_at"])
+        not_modified = conditional.check(request, *validators)
+        if not_modified is not None:
+            return not_modified
+        return conditional.with_validators(Response(data, status=status.HTTP_200_OK), *validators)
 
     @swagger_auto_schema(operation_summary="Remove an order")
     def delete(self, request, order_id):
@@ -108,8 +340,9 @@ class OrderDetailView(generics.GenericAPIView):
 
 
 # Update Order Status (Admin only)
-class UpdateOrderStatusView(generics.GenericAPIView):
+class UpdateOrderStatusView(IdempotentViewMixin, generics.GenericAPIView):
     serializer_class = OrderStatusUpdateSerializer
+    idempotent_methods = ("PUT",)
     permission_classes = [IsAdminUser]
 
     def get_throttles(self):
@@ -117,18 +350,78 @@ class UpdateOrderStatusView(generics.GenericAPIView):
             return [AdminOrderWriteThrottle()]
         return super().get_throttles()
 
-    @swagger_auto_schema(operation_summary="Update an order status")
+    @swagger_auto_schema(operation_summary="Update an order status", manual_parameters=[IDEMPOTENCY_KEY_PARAMETER])
     def put(self, request, order_id):
         order = get_object_or_404(Order, pk=order_id)
+
+        # If-Match: refuse to overwrite a newer version of the order
+        precondition_failed = conditional.check(request, *conditional.instance_validators(order))
+        if precondition_failed is not None:
+            return precondition_failed
+
         serializer = self.serializer_class(instance=order, data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if not conditional.save_if_unchanged(serializer):
+            return conditional.write_conflict(request)
+        return conditional.with_validators(Response(serializer.data, status=status.HTTP_200_OK), *conditional.instance_validators(order))
+
+
+# Move many orders to the next status at once (Admin only)
+class BulkOrderStatusView(IdempotentViewMixin, generics.GenericAPIView):
+    serializer_class = OrderBulkStatusSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_throttles(self):
+        return [AdminOrderWriteThrottle()]
+
+    @swagger_auto_schema(operation_summary="Update the status of many orders", manual_parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data['order_status']
+        required = Order.STATUS_TRANSITIONS[target]
+        ids = serializer.validated_data.get('ids')
+        max_size = settings.ORDER_BULK_MAX_SIZE
+
+        if ids is not None:
+            if len(ids) > max_size:
+                return Response({"detail": f"A batch can hold at most {max_size} orders."}, status=status.HTTP_400_BAD_REQUEST)
+            orders = Order.objects.filter(pk__in=ids)
+        else:
+            orders = filter_orders(serializer.validated_data['filter'], Order.objects.all(), search_customer=True)
+
+        with transaction.atomic():
+            # A filter locks at most one row past the batch size before it is refused
+            current = dict(orders.select_for_update().order_by('id').values_list('id', 'order_status')[:max_size + 1])
+            if len(current) > max_size:
+                return Response(
+                    {"detail": f"The filter matches more than {max_size} orders, narrow it down."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            updated = [order_id for order_id, order_status in current.items() if order_status == required]
+            # Conditional UPDATE, the status check is repeated in the WHERE clause
+            updated_at = timezone.now()
+            Order.objects.filter(pk__in=updated, order_status=required).update(order_status=target, updated_at=updated_at)
+            stats.record_transition(updated, required, target)
+            transaction.on_commit(lambda: events.publish_statuses(updated, target, updated_at))
+
+        # update() skips the Order signals
+        invalidate_order_detail(*updated)
+
+        skipped = [
+            {"id": order_id, "reason": f"Order is {order_status}, expected {required}."}
+            for order_id, order_status in current.items() if order_status != required
+        ]
+        if ids is not None:
+            skipped += [{"id": order_id, "reason": "Order not found."} for order_id in dict.fromkeys(ids) if order_id not in current]
+
+        return Response({"order_status": target, "updated": sorted(updated), "skipped": skipped}, status=status.HTTP_200_OK)
 
 
 # Full Update Order (User & Admin only)
-class UpdateOrderView(generics.GenericAPIView):
+class UpdateOrderView(IdempotentViewMixin, generics.GenericAPIView):
     serializer_class = OrderUpdateSerializer
+    idempotent_methods = ("PUT",)
     permission_classes = [IsAuthenticated]
 
     def get_throttles(self):
@@ -138,23 +431,29 @@ class UpdateOrderView(generics.GenericAPIView):
             return [UserOrderThrottle()]
         return super().get_throttles()
 
-    @swagger_auto_schema(operation_summary="Update an order by id")
+    @swagger_auto_schema(operation_summary="Update an order by id", manual_parameters=[IDEMPOTENCY_KEY_PARAMETER])
     def put(self, request, order_id):
         order = get_object_or_404(Order, pk=order_id)
 
         # Permissions & restrictions
         if not request.user.is_staff:
             # Users can only update their own orders
-            if order.customer != request.user:
+            if order.customer_id != request.user.id:
                 return Response({"detail": "You do not have permission to update this order."},status=status.HTTP_403_FORBIDDEN)
             # Users cannot update if order is in transit or delivered
             if order.order_status != Order.StatusChoices.PENDING:
                 return Response({"detail": "Cannot update an order that is in transit or delivered."},status=status.HTTP_400_BAD_REQUEST)
 
+        # If-Match: refuse to overwrite a newer version of the order
+        precondition_failed = conditional.check(request, *conditional.instance_validators(order))
+        if precondition_failed is not None:
+            return precondition_failed
+
         serializer = self.serializer_class(instance=order, data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if not conditional.save_if_unchanged(serializer):
+            return conditional.write_conflict(request)
+        return conditional.with_validators(Response(serializer.data, status=status.HTTP_200_OK), *conditional.instance_validators(order))
 
 
 
@@ -171,31 +470,20 @@ class UserOrdersView(generics.GenericAPIView):
     def get(self, request, user_id=None):
         # Admins can fetch any user's orders
         if request.user.is_staff and user_id:
-            user = get_object_or_404(User, pk=user_id)
+            customer_id = get_object_or_404(User.objects.only('id'), pk=user_id).pk
         else:
-            user = request.user
+            customer_id = request.user.id
 
-        if not request.user.is_staff and user != request.user:
+        if not request.user.is_staff and customer_id != request.user.id:
             return Response({"detail": "You do not have permission to view this user's orders."}, status=status.HTTP_403_FORBIDDEN)
 
-        orders = Order.objects.filter(customer=user)
+        orders = Order.objects.for_listing().filter(customer_id=customer_id)
 
         # Filtering
-        status_filter = request.query_params.get('status')
-        size_filter = request.query_params.get('size')
-        search = request.query_params.get('search')
-
-        if status_filter:
-            orders = orders.filter(order_status=status_filter.upper())
-        if size_filter:
-            orders = orders.filter(size=size_filter.upper())
-        if search:
-            orders = orders.filter(Q(id__icontains=search))
+        orders = filter_orders(request.query_params, orders)
 
-        paginator = StandardResultsSetPagination()
-        result_page = paginator.paginate_queryset(orders, request)
-        serializer = self.serializer_class(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        # Conditional GET & Pagination
+        return order_list_response(request, orders)
 
 
 # Retrieve a specific order for a user
@@ -210,13 +498,19 @@ class UserOrderDetail(generics.GenericAPIView):
     def get(self, request, order_id, user_id=None):
         # Admin can query any user
         if request.user.is_staff and user_id:
-            user = get_object_or_404(User, pk=user_id)
+            customer_id = get_object_or_404(User.objects.only('id'), pk=user_id).pk
         else:
-            user = request.user
+            customer_id = request.user.id
 
-        if not request.user.is_staff and user != request.user:
+        if not request.user.is_staff and customer_id != request.user.id:
             return Response({"detail": "You do not have permission to view this user's order."}, status=status.HTTP_403_FORBIDDEN)
 
-        order = get_object_or_404(Order, pk=order_id, customer=user)
-        serializer = self.serializer_class(order)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        data = get_order_detail(order_id, lambda: load_order_detail(order_id))
+        if data["customer"]["id"] != customer_id:
+            # Same answer as a missing order, and as the async view
+            raise Http404("No Order matches the given query.")
+        validators = conditional.order_validators(order_id, data["updated_at"])
+        not_modified = conditional.check(request, *validators)
+        if not_modified is not None:
+            return not_modified
+        return conditional.with_validators(Response(data, status=status.HTTP_200_OK), *validators)
\ No newline at end of file
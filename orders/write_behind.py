@@ -0,0 +1,203 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from .models import Order
+from . import search, stats
+
+User = get_user_model()
+
+
+# Write-behind journal for order creation (ORDER_WRITE_BEHIND).
+# The create endpoint appends validated orders to a SQLite file of its own,
+# so accepting an order never waits on the main database's write lock, and
+# the process_order_queue command persists them in batches. Every entry keeps
+# its state so clients can poll the tracking id:
+#   queued -> processing -> persisted (with order_id) or failed (with error)
+# Orders are saved with the entry's tracking id, so an entry persisted twice
+# (a worker crashing before it marked the batch) still creates one order.
+
+QUEUED = "queued"
+PROCESSING = "processing"
+PERSISTED = "persisted"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queued_order (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tracking_id TEXT NOT NULL UNIQUE,
+    customer_id INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    order_id INTEGER,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS queued_order_state_idx ON queued_order (state, id);
+"""
+
+_local = threading.local()
+
+
+def get_connection():
+    # One connection per thread; the file is shared by every web and worker process
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        path = Path(settings.ORDER_QUEUE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(path, timeout=settings.ORDER_QUEUE_BUSY_TIMEOUT, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        # WAL lets the endpoint append while the worker reads; synchronous=FULL keeps accepted orders across a crash
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=FULL")
+        connection.executescript(SCHEMA)
+        _local.connection = connection
+    return connection
+
+
+@contextmanager
+def immediate():
+    # Write transaction; the connection is in autocommit mode otherwise
+    connection = get_connection()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+def enqueue(customer_id, validated_data):
+    tracking_id = uuid.uuid4().hex
+    now = time.time()
+    get_connection().execute(
+        "INSERT INTO queued_order (tracking_id, customer_id, payload, state, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (tracking_id, int(customer_id), json.dumps(validated_data), QUEUED, now, now),
+    )
+    return tracking_id
+
+
+def get_entry(tracking_id):
+    row = get_connection().execute(
+        "SELECT tracking_id, customer_id, state, order_id, error, created_at, updated_at "
+        "FROM queued_order WHERE tracking_id = ?",
+        (tracking_id,),
+    ).fetchone()
+    return dict(row) if row is not None else None
+
+
+def claim(batch_size):
+    # Moves the oldest queued entries to processing in one write transaction
+    with immediate() as connection:
+        rows = connection.execute(
+            "SELECT id, tracking_id, customer_id, payload FROM queued_order WHERE state = ? ORDER BY id LIMIT ?",
+            (QUEUED, batch_size),
+        ).fetchall()
+        now = time.time()
+        connection.executemany(
+            "UPDATE queued_order SET state = ?, updated_at = ? WHERE id = ?", [(PROCESSING, now, row["id"]) for row in rows]
+        )
+    return [(row["id"], row["tracking_id"], row["customer_id"], json.loads(row["payload"])) for row in rows]
+
+
+def mark_persisted(entries):
+    # entries: (queue id, order id) pairs
+    now = time.time()
+    with immediate() as connection:
+        connection.executemany(
+            "UPDATE queued_order SET state = ?, order_id = ?, updated_at = ? WHERE id = ?",
+            [(PERSISTED, order_id, now, entry_id) for entry_id, order_id in entries],
+        )
+
+
+def mark_failed(entries):
+    # entries: (queue id, error message) pairs
+    now = time.time()
+    with immediate() as connection:
+        connection.executemany(
+            "UPDATE queued_order SET state = ?, error = ?, updated_at = ? WHERE id = ?",
+            [(FAILED, error, now, entry_id) for entry_id, error in entries],
+        )
+
+
+def requeue_stale():
+    # Entries a crashed worker claimed but never finished. The worker may have
+    # committed them to the database already; persist() finds those by tracking id
+    cursor = get_connection().execute(
+        "UPDATE queued_order SET state = ?, updated_at = ? WHERE state = ?", (QUEUED, time.time(), PROCESSING)
+    )
+    return cursor.rowcount
+
+
+def purge(older_than):
+    cursor = get_connection().execute(
+        "DELETE FROM queued_order WHERE state IN (?, ?) AND updated_at < ?", (PERSISTED, FAILED, time.time() - older_than)
+    )
+    return cursor.rowcount
+
+
+def pending_count():
+    return get_connection().execute(
+        "SELECT COUNT(*) FROM queued_order WHERE state IN (?, ?)", (QUEUED, PROCESSING)
+    ).fetchone()[0]
+
+
+def persist(entries):
+    # Writes claimed entries with one bulk_create; a failing batch is retried
+    # row by row so one bad entry only fails itself. Entries already in the
+    # database (requeued after a crash) are only marked persisted. Both lookups
+    # read the primary, the replica may not have the previous batch yet
+    existing = dict(
+        Order.objects.using("default").filter(tracking_id__in=[tracking_id for _, tracking_id, _, _ in entries])
+        .values_list("tracking_id", "id")
+    )
+    customers = User.objects.using("default").only("id", "username", "email").in_bulk({customer_id for _, _, customer_id, _ in entries})
+    persisted, orders, failed = [], [], []
+    for entry_id, tracking_id, customer_id, payload in entries:
+        if tracking_id in existing:
+            persisted.append((entry_id, existing[tracking_id]))
+            continue
+        customer = customers.get(customer_id)
+        if customer is None:
+            failed.append((entry_id, "Customer no longer exists."))
+            continue
+        orders.append((entry_id, Order(customer=customer, tracking_id=tracking_id, **payload)))
+
+    try:
+        created = save_orders([order for _, order in orders])
+        persisted += [(entry_id, order.pk) for (entry_id, _), order in zip(orders, created)]
+    except DatabaseError:
+        for entry_id, order in orders:
+            # The rolled back batch may have assigned primary keys
+            order.pk = None
+            try:
+                persisted.append((entry_id, save_orders([order])[0].pk))
+            except DatabaseError as exc:
+                failed.append((entry_id, str(exc)))
+
+    if persisted:
+        mark_persisted(persisted)
+    if failed:
+        mark_failed(failed)
+    return len(persisted), len(failed)
+
+
+def save_orders(orders):
+    if not orders:
+        return []
+    with transaction.atomic():
+        created = Order.objects.bulk_create(orders)
+        # bulk_create skips post_save, index and count the batch directly
+        search.index_orders(created)
+        stats.record_created(created)
+    return created
@@ -0,0 +1,241 @@
+import json
+import logging
+import random
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger("pizza.metrics")
+
+# Timings of the current request, None when it isn't sampled
+_state = ContextVar("request_metrics", default=None)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.timings = {"db": 0.0, "serializer": 0.0, "throttle": 0.0}
+        self.queries = 0
+        self.depth = dict.fromkeys(self.timings, 0)
+
+
+# Records time spent in a block into the current request's metrics.
+# Nested blocks of the same name (e.g. a nested serializer) only count once;
+# queries run inside a block count towards both the block and db.
+class timing:
+    __slots__ = ("name", "state", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.state = _state.get()
+        if self.state is not None:
+            self.state.depth[self.name] += 1
+            self.started = perf_counter()
+
+    def __exit__(self, *exc_info):
+        state = self.state
+        if state is not None:
+            state.depth[self.name] -= 1
+            if state.depth[self.name] == 0:
+                state.timings[self.name] += perf_counter() - self.started
+
+
+# Installed on every database connection; a no-op outside sampled requests
+def record_query(execute, sql, params, many, context):
+    state = _state.get()
+    if state is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        state.timings["db"] += perf_counter() - started
+        state.queries += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+# Per-process aggregates, scraped from the metrics endpoint. Every worker keeps
+# its own, so scrape each one (or sum them in Prometheus).
+class Registry:
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def observe(self, method, endpoint, status_code, total, metrics):
+        with self.lock:
+            entry = self.endpoints.get((method, endpoint))
+            if entry is None:
+                entry = self.endpoints[(method, endpoint)] = {
+                    "buckets": [0] * len(self.buckets),
+                    "count": 0,
+                    "sum": 0.0,
+                    "statuses": {},
+                    "queries": 0,
+                    "timings": dict.fromkeys(metrics.timings, 0.0),
+                }
+            index = bisect_left(self.buckets, total)
+            if index < len(self.buckets):
+                entry["buckets"][index] += 1
+            entry["count"] += 1
+            entry["sum"] += total
+            entry["statuses"][status_code] = entry["statuses"].get(status_code, 0) + 1
+            entry["queries"] += metrics.queries
+            for name, value in metrics.timings.items():
+                entry["timings"][name] += value
+
+    def render(self, sample_rate):
+        lines = [
+            "# HELP http_request_sample_rate Fraction of requests measured",
+            "# TYPE http_request_sample_rate gauge",
+            f"http_request_sample_rate {sample_rate}",
+            "# HELP http_request_duration_seconds Latency of sampled requests",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            for (method, endpoint), entry in endpoints:
+                labels = f'method="{method}",endpoint="{endpoint}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets, entry["buckets"]):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {entry["count"]}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {entry['sum']}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {entry['count']}")
+
+            lines += ["# HELP http_requests_sampled_total Sampled requests by status", "# TYPE http_requests_sampled_total counter"]
+            for (method, endpoint), entry in endpoints:
+                for status_code, count in sorted(entry["statuses"].items()):
+                    lines.append(f'http_requests_sampled_total{{method="{method}",endpoint="{endpoint}",status="{status_code}"}} {count}')
+
+            lines += ["# HELP http_request_db_queries_total Database queries of sampled requests", "# TYPE http_request_db_queries_total counter"]
+            for (method, endpoint), entry in endpoints:
+                lines.append(f'http_request_db_queries_total{{method="{method}",endpoint="{endpoint}"}} {entry["queries"]}')
+
+            lines += [
+                "# HELP http_request_phase_seconds_total Time of sampled requests spent in db, serializer and throttle checks",
+                "# TYPE http_request_phase_seconds_total counter",
+            ]
+            for (method, endpoint), entry in endpoints:
+                for name, value in entry["timings"].items():
+                    lines.append(f'http_request_phase_seconds_total{{method="{method}",endpoint="{endpoint}",phase="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(settings.METRICS_BUCKETS)
+
+
+def get_endpoint(request):
+    # The URL pattern name keeps the label set small, unlike the raw path
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None and match.view_name else "unmatched"
+
+
+def server_timing(total, metrics):
+    return ", ".join([
+        f'db;dur={metrics.timings["db"] * 1000:.1f};desc="{metrics.queries} queries"',
+        f'serializer;dur={metrics.timings["serializer"] * 1000:.1f}',
+        f'throttle;dur={metrics.timings["throttle"] * 1000:.1f}',
+        f"total;dur={total * 1000:.1f}",
+    ])
+
+
+def finish(request, response, metrics, started):
+    total = perf_counter() - started
+    endpoint = get_endpoint(request)
+    registry.observe(request.method, endpoint, response.status_code, total, metrics)
+    if settings.METRICS_SERVER_TIMING:
+        response["Server-Timing"] = server_timing(total, metrics)
+    logger.info(json.dumps({
+        "event": "request",
+        "method": request.method,
+        "endpoint": endpoint,
+        "path": request.path,
+        "status": response.status_code,
+        "duration_ms": round(total * 1000, 2),
+        "db_queries": metrics.queries,
+        "db_ms": round(metrics.timings["db"] * 1000, 2),
+        "serializer_ms": round(metrics.timings["serializer"] * 1000, 2),
+        "throttle_ms": round(metrics.timings["throttle"] * 1000, 2),
+    }))
+
+
+# Measures a METRICS_SAMPLE_RATE fraction of requests; the rest only pay for one
+# random() call. Keep it first in MIDDLEWARE so the total covers the whole stack.
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    # Connections opened before this module was imported
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if random.random() >= settings.METRICS_SAMPLE_RATE:
+                return await get_response(request)
+            metrics = RequestMetrics()
+            token = _state.set(metrics)
+            started = perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _state.reset(token)
+            finish(request, response, metrics, started)
+            return response
+    else:
+        def middleware(request):
+            if random.random() >= settings.METRICS_SAMPLE_RATE:
+                return get_response(request)
+            metrics = RequestMetrics()
+            token = _state.set(metrics)
+            started = perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _state.reset(token)
+            finish(request, response, metrics, started)
+            return response
+    return middleware
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = "text/plain"
+    format = "txt"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Error responses (401/403) carry a dict
+        return (data if isinstance(data, str) else json.dumps(data)).encode(self.charset)
+
+
+# Prometheus text exposition of this process' aggregates (Admin only)
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+    renderer_classes = [PrometheusRenderer]
+    # Scrapers poll on a fixed interval
+    throttle_classes = []
+    swagger_schema = None
+
+    def get(self, request):
+        return Response(registry.render(settings.METRICS_SAMPLE_RATE), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,81 @@
+import io
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+# orjson is optional; without it (or with FAST_JSON off) both classes behave
+# exactly like DRF's, which they subclass
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Z suffix for UTC like DRF's encoder, dict subclasses (ReturnDict, OrderedDict) natively
+ORJSON_OPTIONS = orjson.OPT_UTC_Z if orjson is not None else 0
+
+LINE_SEPARATORS = (b"\xe2\x80\xa8", b"\xe2\x80\xa9")
+
+
+def fast_json_enabled():
+    return orjson is not None and settings.FAST_JSON
+
+
+# Drop-in JSONRenderer that encodes with orjson. Output is byte-for-byte what
+# JSONRenderer produces with the default COMPACT_JSON / UNICODE_JSON settings;
+# anything orjson can't reproduce (indent=, ASCII output, huge ints, non-str
+# keys) is handed to JSONRenderer. One deliberate difference: NaN and Infinity
+# render as null instead of raising (STRICT_JSON). No order payload holds a
+# float, and looking for one cost more than the orjson call itself.
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None
+            or not fast_json_enabled()
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            # DRF's encoder handles the types orjson doesn't (Decimal, lazy strings, QuerySets...)
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # JSONRenderer escapes U+2028/U+2029 so the output is also valid JavaScript
+        if LINE_SEPARATORS[0] in ret or LINE_SEPARATORS[1] in ret:
+            ret = ret.replace(LINE_SEPARATORS[0], b"\\u2028").replace(LINE_SEPARATORS[1], b"\\u2029")
+        return ret
+
+
+# Drop-in JSONParser that decodes UTF-8 bodies with orjson. Bodies orjson
+# rejects go through JSONParser, so errors and edge cases (e.g. integers
+# beyond 64 bits) are reported exactly as before.
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if not fast_json_enabled() or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+_renderer = FastJSONRenderer()
+
+
+# JsonResponse for plain Django views, rendered the same way as the DRF views
+class FastJSONResponse(HttpResponse):
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(_renderer.render(data), **kwargs)
@@ -0,0 +1,101 @@
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.decorators import sync_and_async_middleware
+
+
+REPLICA = "replica"
+PIN_KEY = "db:pin:{}"
+# Only these requests read from the replica; anything else may write back what
+# it reads (If-Match checks, save()) and stays on the primary from its first query
+REPLICA_METHODS = {"GET", "HEAD"}
+
+# Per-request routing state: the request and whether it has written yet
+_state = ContextVar("db_routing_state", default=None)
+
+
+class RoutingState:
+    def __init__(self, request):
+        self.request = request
+        self.wrote = False
+        self.pinned = None
+
+    def user_id(self):
+        user = getattr(self.request, "user", None)
+        # DRF stores the authenticated user on the Django request
+        if user is None or not getattr(user, "is_authenticated", False):
+            return None
+        return user.id
+
+    def is_pinned(self):
+        if self.wrote or self.request.method not in REPLICA_METHODS:
+            return True
+        if self.pinned is None:
+            user_id = self.user_id()
+            if user_id is None:
+                return False
+            self.pinned = bool(cache.get(PIN_KEY.format(user_id)))
+        return self.pinned
+
+
+# Order reads made by GET/HEAD requests go to the replica; everything else, all
+# writes and code running outside a request (workers, commands) use the primary.
+# A user who wrote is pinned to the primary for DB_REPLICA_PIN_SECONDS so they
+# read their own writes while the replica catches up.
+class PrimaryReplicaRouter:
+    replica_apps = {"orders"}
+
+    def db_for_read(self, model, **hints):
+        if REPLICA not in settings.DATABASES or model._meta.app_label not in self.replica_apps:
+            return None
+        # Reads inside a transaction (e.g. select_for_update) must see its writes
+        if connections["default"].in_atomic_block:
+            return "default"
+        state = _state.get()
+        if state is None or state.is_pinned():
+            return "default"
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds a copy of the primary
+        return True
+
+
+def pin_after_write(state):
+    user_id = state.user_id()
+    if state.wrote and user_id is not None:
+        cache.set(PIN_KEY.format(user_id), True, settings.DB_REPLICA_PIN_SECONDS)
+
+
+@sync_and_async_middleware
+def replica_pin_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            state = RoutingState(request)
+            token = _state.set(state)
+            try:
+                response = await get_response(request)
+            finally:
+                _state.reset(token)
+            await sync_to_async(pin_after_write)(state)
+            return response
+    else:
+        def middleware(request):
+            state = RoutingState(request)
+            token = _state.set(state)
+            try:
+                response = get_response(request)
+            finally:
+                _state.reset(token)
+            pin_after_write(state)
+            return response
+    return middleware
@@ -33,17 +33,38 @@ INSTALLED_APPS = [
     'orders',
     'rest_framework',
     'djoser',
-    'drf_yasg',   
 ]
 
+# API docs (/swagger.json, /swagger.yaml, /docs/, /redoc/). Off, drf_yasg is never imported.
+# The schema is served from API_SCHEMA_DIR, written by manage.py generate_schema on
+# deploy; with API_SCHEMA_AUTOGENERATE a missing file is generated on first request.
+API_DOCS_ENABLED = config('API_DOCS_ENABLED', default=True, cast=bool)
+API_SCHEMA_DIR = config('API_SCHEMA_DIR', default=str(BASE_DIR / '.schema'))
+API_SCHEMA_AUTOGENERATE = config('API_SCHEMA_AUTOGENERATE', default=True, cast=bool)
+API_DOCS_CACHE_TIMEOUT = config('API_DOCS_CACHE_TIMEOUT', default=3600, cast=int)
+if API_DOCS_ENABLED:
+    INSTALLED_APPS.append('drf_yasg')
+    # The docs pages load the precomputed schema instead of ?format=openapi
+    # (SWAGGER_SETTINGS below sets the same SPEC_URL)
+    REDOC_SETTINGS = {'SPEC_URL': '/swagger.json'}
+
 
 
 AUTH_USER_MODEL = 'authentication.User'
 REST_FRAMEWORK={
     'NON_FIELD_ERRORS_KEY':'error',
     'DEFAULT_AUTHENTICATION_CLASSES':(
-     'rest_framework_simplejwt.authentication.JWTAuthentication',
+     'authentication.tokens.ClaimsJWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': [
+        'pizza.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'pizza.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.AnonRateThrottle',
         'rest_framework.throttling.UserRateThrottle',
@@ -54,6 +75,8 @@ REST_FRAMEWORK={
 
         
         "order_create": "30/hour",
+        # Counted in orders, not requests; keep it above ORDER_BULK_MAX_SIZE
+        "order_bulk_create": "1000/hour",
         "user_orders": "50/hour",
         "admin_order_read": "100/hour",
         "admin_order_write": "100/hour",
@@ -62,13 +85,68 @@ REST_FRAMEWORK={
     }
 }
 
+# Encode and decode API JSON with orjson when it is installed (pip install orjson);
+# output is identical to DRF's JSONRenderer either way
+FAST_JSON = config('FAST_JSON', default=True, cast=bool)
+
+# Order throttles: "history" (DRF timestamp lists) or "sliding_window" (counters,
+# only with a Redis/Memcached CACHE_BACKEND, checked at startup)
+ORDER_THROTTLE_ENGINE = config('ORDER_THROTTLE_ENGINE', default='history')
+# Off only for load tests and benchmarks
+ORDER_THROTTLES_ENABLED = config('ORDER_THROTTLES_ENABLED', default=True, cast=bool)
+
+# Largest batch accepted by the bulk order endpoints
+ORDER_BULK_MAX_SIZE = config('ORDER_BULK_MAX_SIZE', default=500, cast=int)
+
+# Write-behind order creation: POST /orders/orders/ validates, appends to a local
+# SQLite journal and answers 202 with a tracking id; run manage.py process_order_queue
+# to persist the orders. Persisted/failed entries are kept ORDER_QUEUE_RETENTION seconds
+ORDER_WRITE_BEHIND = config('ORDER_WRITE_BEHIND', default=False, cast=bool)
+ORDER_QUEUE_PATH = config('ORDER_QUEUE_PATH', default=str(BASE_DIR / '.queue' / 'orders.sqlite3'))
+ORDER_QUEUE_BUSY_TIMEOUT = config('ORDER_QUEUE_BUSY_TIMEOUT', default=5, cast=float)
+ORDER_QUEUE_BATCH_SIZE = config('ORDER_QUEUE_BATCH_SIZE', default=200, cast=int)
+ORDER_QUEUE_RETENTION = config('ORDER_QUEUE_RETENTION', default=7 * 24 * 3600, cast=int)
+
+# Rows fetched per round trip by the streaming order export
+ORDER_EXPORT_CHUNK_SIZE = config('ORDER_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Serve the order read endpoints from async views (run under ASGI, e.g. uvicorn pizza.asgi:application)
+ORDER_ASYNC_READS = config('ORDER_ASYNC_READS', default=False, cast=bool)
+
+# Order status push (SSE). LocalEventBackend is per process; use
+# orders.events.RedisEventBackend to share events between workers
+ORDER_EVENTS_BACKEND = config('ORDER_EVENTS_BACKEND', default='orders.events.LocalEventBackend')
+ORDER_EVENTS_REDIS_URL = config('ORDER_EVENTS_REDIS_URL', default='redis://127.0.0.1:6379/2')
+ORDER_EVENTS_KEEPALIVE = config('ORDER_EVENTS_KEEPALIVE', default=15, cast=int)
+
+# Idempotency-Key on the order write endpoints: how long responses are kept for
+# replay, how long a request holds the key and how long duplicates wait for it.
+# Keys are stored in the database, run purge_idempotency_keys to drop old ones
+IDEMPOTENCY_TTL = config('IDEMPOTENCY_TTL', default=86400, cast=int)
+IDEMPOTENCY_LOCK_TIMEOUT = config('IDEMPOTENCY_LOCK_TIMEOUT', default=30, cast=int)
+IDEMPOTENCY_LOCK_WAIT = config('IDEMPOTENCY_LOCK_WAIT', default=2, cast=float)
+
+# Order search: FTS5 on SQLite, tsvector on PostgreSQL, prefix lookups otherwise
+ORDER_SEARCH_FULL_TEXT = config('ORDER_SEARCH_FULL_TEXT', default=True, cast=bool)
+
 SIMPLE_JWT = {
    'AUTH_HEADER_TYPES': ('Bearer',),
    'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
    'BlACKLIST_AFTER_ROTATION':False,
+   'TOKEN_OBTAIN_SERIALIZER': 'authentication.tokens.ClaimsTokenObtainPairSerializer',
+   'TOKEN_USER_CLASS': 'authentication.tokens.ClaimsUser',
 }
+
+# Requests with an access token younger than JWT_CLAIMS_MAX_AGE seconds are served
+# from its claims; older tokens load the user row (cached for JWT_USER_CACHE_TIMEOUT
+# seconds) so deactivated or demoted accounts are picked up. JWT_REVOCATION_CHECK
+# loads the row for every token
+JWT_REVOCATION_CHECK = config('JWT_REVOCATION_CHECK', default=False, cast=bool)
+JWT_CLAIMS_MAX_AGE = config('JWT_CLAIMS_MAX_AGE', default=300, cast=int)
+JWT_USER_CACHE_TIMEOUT = config('JWT_USER_CACHE_TIMEOUT', default=60, cast=int)
 SWAGGER_SETTINGS = {
+   'SPEC_URL': '/swagger.json',
    'SECURITY_DEFINITIONS': {
       'Bearer': {
             'type': 'apiKey',
@@ -79,6 +157,7 @@ SWAGGER_SETTINGS = {
 }
 
 MIDDLEWARE = [
+    'pizza.metrics.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -86,6 +165,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'pizza.routers.replica_pin_middleware',
 ]
 
 ROOT_URLCONF = 'pizza.urls'
@@ -111,13 +191,143 @@ WSGI_APPLICATION = 'pizza.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
+# DB_ENGINE selects sqlite (default), postgresql or mysql. Connections are kept
+# open for DB_CONN_MAX_AGE seconds and health-checked before reuse; on PostgreSQL
+# DB_POOL=True uses psycopg's driver-level pool instead (needs psycopg[pool]).
+
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # WAL lets readers run alongside the single writer
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f"PRAGMA busy_timeout={config('DB_SQLITE_BUSY_TIMEOUT', default=5000, cast=int)};"
+                    f"PRAGMA mmap_size={config('DB_SQLITE_MMAP_SIZE', default=134217728, cast=int)};"
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': f'django.db.backends.{DB_ENGINE}',
+            'NAME': config('DB_NAME'),
+            'USER': config('DB_USER', default=''),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default=''),
+            # Django's pool and persistent connections are mutually exclusive
+            'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if DB_ENGINE == 'postgresql' and DB_POOL:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+
+# Read replica for order reads. Set DB_REPLICA_NAME (a second SQLite file works
+# as a local stand-in, migrate it with --database replica) and, for server
+# backends, DB_REPLICA_HOST/PORT. Tests mirror it onto the primary.
+
+DB_REPLICA_NAME = config('DB_REPLICA_NAME', default='')
+DB_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=5, cast=int)
+
+if DB_REPLICA_NAME:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': DB_REPLICA_NAME,
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DB_ENGINE != 'sqlite':
+        DATABASES['replica']['HOST'] = config('DB_REPLICA_HOST', default=DATABASES['default']['HOST'])
+        DATABASES['replica']['PORT'] = config('DB_REPLICA_PORT', default=DATABASES['default']['PORT'])
+
+DATABASE_ROUTERS = ['pizza.routers.PrimaryReplicaRouter']
+
+
+# Cache
+# Shared by every worker (throttling, order detail cache). The file cache works
+# out of the box; point CACHE_BACKEND/CACHE_LOCATION at Redis in production, e.g.
+# django.core.cache.backends.redis.RedisCache and redis://127.0.0.1:6379/1.
+# The sliding-window throttle counters need its atomic incr(), the file cache
+# can lose increments under concurrent requests (see ORDER_THROTTLE_ENGINE)
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / '.cache')),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
     }
 }
 
+ORDER_DETAIL_CACHE_TIMEOUT = config('ORDER_DETAIL_CACHE_TIMEOUT', default=60, cast=int)
+
+
+# Request instrumentation (pizza.metrics)
+# Fraction of requests timed (0 turns it off). Sampled requests are logged to
+# pizza.metrics as JSON, aggregated for /metrics/ and, with METRICS_SERVER_TIMING,
+# get a Server-Timing header browsers' dev tools can show.
+METRICS_SAMPLE_RATE = config('METRICS_SAMPLE_RATE', default=0.1, cast=float)
+METRICS_SERVER_TIMING = config('METRICS_SERVER_TIMING', default=DEBUG, cast=bool)
+# Latency histogram bucket bounds in seconds
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'pizza.metrics': {
+            'handlers': ['console'],
+            'level': config('METRICS_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+
+# Password hashing
+# PASSWORD_HASHER picks the hasher for new passwords: pbkdf2, scrypt or argon2
+# (argon2 needs argon2-cffi). The others stay listed so existing hashes verify;
+# they are upgraded transparently on the next login. Cost settings left at 0
+# keep Django's defaults.
+
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2')
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=0, cast=int)
+PASSWORD_SCRYPT_WORK_FACTOR = config('PASSWORD_SCRYPT_WORK_FACTOR', default=0, cast=int)
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=0, cast=int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=0, cast=int)
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', default=0, cast=int)
+
+TUNED_PASSWORD_HASHERS = {
+    'pbkdf2': 'authentication.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'authentication.hashers.TunedScryptPasswordHasher',
+    'argon2': 'authentication.hashers.TunedArgon2PasswordHasher',
+}
+PASSWORD_HASHERS = [TUNED_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in TUNED_PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
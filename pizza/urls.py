@@ -1,19 +1,8 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include, re_path
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="PIZZA DELIVERY API",
-        default_version='v1',
-        description="A REST API for a Pizza delivery service",
-        contact=openapi.Contact(email="admin@gmail.com"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from pizza.metrics import MetricsView
+from pizza import schema
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -25,8 +14,14 @@ urlpatterns = [
     # Orders app
     path('orders/', include('orders.urls')),
 
-    # Swagger / API docs
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    # Prometheus metrics (Admin only)
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
+
+# Swagger / API docs, served from the file written by manage.py generate_schema
+if settings.API_DOCS_ENABLED:
+    urlpatterns += [
+        re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema.SchemaFileView.as_view(), name='schema-json'),
+        path('docs/', schema.docs_view('swagger'), name='schema-swagger-ui'),
+        path('redoc/', schema.docs_view('redoc'), name='schema-redoc'),
+    ]